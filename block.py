@@ -10,15 +10,26 @@ University of Toronto
 
 This file contains the Block class, the main data structure used in the game.
 """
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 import random
 import math
-from renderer import COLOUR_LIST, TEMPTING_TURQUOISE, BLACK, colour_name
+import numpy
+from renderer import COLOUR_LIST, TEMPTING_TURQUOISE, BLACK, colour_name, \
+    colour_index
 
 
 HIGHLIGHT_COLOUR = TEMPTING_TURQUOISE
 FRAME_COLOUR = BLACK
 
+# Constants for Block.board_hash.  A unit cell of each colour in COLOUR_LIST
+# has a fixed random 64-bit key.  SOLID_HASHES[h][c] is the hash of a solid
+# block of colour c, h levels above the unit cells, and grows as needed.
+HASH_MASK = 2 ** 64 - 1
+HASH_MULTIPLIERS = [0x9e3779b97f4a7c15, 0xc2b2ae3d27d4eb4f,
+                    0x165667b19e3779f9, 0xd6e8feb86659fd93]
+SOLID_HASHES = [[0xb3f22c6e674be40d, 0xcb9a56aea2d2e1dd,
+                 0xe1c2fd10f8633915, 0xdc4254b509f5a50a]]
+
 
 class Block:
     """A square block in the Blocky game.
@@ -71,6 +82,52 @@ class Block:
     highlighted: bool
     children: List['Block']
     parent: Optional['Block']
+    # === Private Attributes ===
+    # _flattened:
+    #     The cached result of flatten for this Block, or None if the Block
+    #     (or one of its descendants) has changed since it was last flattened.
+    # _flattened_array:
+    #     The cached result of flatten_array for this Block, with the same
+    #     invalidation rules as _flattened.
+    # _children:
+    #     The children of this Block as they are stored, before this Block's
+    #     pending rotation is applied.  The public <children> are resolved
+    #     from them on demand.
+    # _rotation:
+    #     The number of clockwise quarter turns that have been applied to this
+    #     Block but not yet pushed down into _children.  Both caches above
+    #     describe the stored children, without this rotation.
+    # _layout_stale:
+    #     True iff the position and size of the children must be recomputed
+    #     from the position and size of this Block before they are read.
+    # _hashes:
+    #     The cached board_hash of the stored children after 0, 1, 2 and 3
+    #     clockwise quarter turns, or None with the same invalidation rules
+    #     as _flattened.
+    # _position:
+    #     The value of <position>, which may be out of date while a Block
+    #     containing this one has a pending rotation or a stale layout.
+    # _size:
+    #     The value of <size>, with the same caveat as _position.
+    # _highlighted:
+    #     The value of <highlighted>.
+    # _state:
+    #     Only used on the root of a board: what is kept about the board as a
+    #     whole, or None until something needs it.
+    #
+    # == Representation Invariants concerning the private attributes ==
+    #     0 <= _rotation <= 3
+    #     _rotation == 0 and not _layout_stale if this Block has no children
+    _flattened: Optional[List[List[Tuple[int, int, int]]]]
+    _flattened_array: Optional[numpy.ndarray]
+    _children: List['Block']
+    _rotation: int
+    _layout_stale: bool
+    _hashes: Optional[Tuple[int, int, int, int]]
+    _position: Tuple[int, int]
+    _size: int
+    _highlighted: bool
+    _state: Optional['BoardState']
 
     def __init__(self, level: int,
                  colour: Optional[Tuple[int, int, int]] = None,
@@ -84,12 +141,18 @@ class Block:
         and max_depth) to 0.  (All attributes can be updated later, as
         appropriate.)
         """
-        self.position = (0, 0)
-        self.size = 0
+        self._position = (0, 0)
+        self._size = 0
         self.level = level
         self.max_depth = 0
-        self.highlighted = False
+        self._highlighted = False
         self.parent = None
+        self._flattened = None
+        self._flattened_array = None
+        self._hashes = None
+        self._rotation = 0
+        self._layout_stale = False
+        self._state = None
 
         # attributes that depend on whether or not block is subdivided
         if children is None:  # if the block is not subdivided
@@ -101,10 +164,113 @@ class Block:
             set_parent(self, self.children)
             self.colour = None
 
-    def rectangles_to_draw(self) -> List[Tuple[Tuple[int, int, int],
-                                               Tuple[float, float],
-                                               Tuple[float, float],
-                                               int]]:
+    @property
+    def children(self) -> List['Block']:
+        """The children of this Block, with any pending rotation applied
+        and their positions and sizes brought up to date.
+        """
+        if self._rotation != 0 or self._layout_stale:
+            self._resolve()
+        return self._children
+
+    @children.setter
+    def children(self, children: List['Block']) -> None:
+        self._children = children
+        self._rotation = 0
+        self._layout_stale = len(children) > 0
+        self._mark_dirty()
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """The (x, y) coordinates of the upper left corner of this Block,
+        brought up to date with the Blocks that contain it.
+        """
+        self._resolve_ancestors()
+        return self._position
+
+    @position.setter
+    def position(self, position: Tuple[int, int]) -> None:
+        self._position = position
+
+    @property
+    def size(self) -> int:
+        """The height and width of this Block, brought up to date with
+        the Blocks that contain it.
+        """
+        self._resolve_ancestors()
+        return self._size
+
+    @size.setter
+    def size(self, size: int) -> None:
+        self._size = size
+
+    @property
+    def highlighted(self) -> bool:
+        """True iff the user has selected this block for action."""
+        return self._highlighted
+
+    @highlighted.setter
+    def highlighted(self, highlighted: bool) -> None:
+        if highlighted != self._highlighted:
+            self._highlighted = highlighted
+            self._record_change(False)
+
+    def _resolve(self) -> None:
+        """Push the pending rotation of this Block down one level, and
+        recompute the position and size of its children.
+
+        Each child only receives the rotation as its own pending rotation,
+        so this takes constant time no matter how big this Block is.
+        """
+        turns = self._rotation
+        if turns != 0:
+            old = self._children
+            self._children = [old[(i + turns) % 4] for i in range(4)]
+            for child in self._children:
+                if len(child._children) > 0:
+                    child._rotation = (child._rotation + turns) % 4
+            self._rotation = 0
+            # The caches describe the stored children, which are now rotated.
+            if self._flattened is not None:
+                self._flattened = rotate_grid(self._flattened, turns)
+            if self._flattened_array is not None:
+                self._flattened_array = rotate_array(self._flattened_array,
+                                                     turns)
+            if self._hashes is not None:
+                self._hashes = self._hashes[turns:] + self._hashes[:turns]
+        self._layout_stale = False
+        self.update_child_block_locations(self._position,
+                                          round(self._size / 2.0))
+
+    def _resolve_ancestors(self) -> None:
+        """Push the pending rotations and layouts of the Blocks containing
+        this Block down to it, from the root down.
+
+        A Block that was reached through <children> before one of the Blocks
+        containing it was rotated is then in its place on the board again.
+        Only the Blocks on the path from the root are resolved, so this takes
+        O(max_depth) time.
+        """
+        block = self.parent
+        while block is not None and block._rotation == 0 and \
+                not block._layout_stale:
+            block = block.parent
+        if block is not None:
+            chain = []
+            block = self.parent
+            while block is not None:
+                chain.append(block)
+                block = block.parent
+            # Resolving a Block passes its rotation and layout on to its
+            # children, so each Block is checked after its parent.
+            for block in reversed(chain):
+                if block._rotation != 0 or block._layout_stale:
+                    block._resolve()
+
+    def rectangles_to_draw(self, area: Optional[Tuple[float, float,
+                                                      float, float]] = None) \
+            -> List[Tuple[Tuple[int, int, int], Tuple[float, float],
+                          Tuple[float, float], int]]:
         """
         Return a list of tuples describing all of the rectangles to be drawn
         in order to render this Block.
@@ -130,11 +296,22 @@ class Block:
           the outline.
 
         The order of the rectangles does not matter.
-        """
-        size = (float(self.size), float(self.size))
-        position = (float(self.position[0]), float(self.position[1]))
 
-        if len(self.children) == 0:  # if  block is not subdivided.
+        If <area> is not None, it is the (x, y, width, height) of a part of
+        the screen, and only the rectangles of the Blocks that overlap it are
+        returned, without visiting any other Blocks.
+        """
+        position = self.position
+        size = (float(self._size), float(self._size))
+        position = (float(position[0]), float(position[1]))
+
+        if area is not None and not (
+                position[0] < area[0] + area[2] and
+                area[0] < position[0] + size[0] and
+                position[1] < area[1] + area[3] and
+                area[1] < position[1] + size[1]):
+            return []
+        elif len(self.children) == 0:  # if  block is not subdivided.
             rec_in_blocks_colour = (self.colour, position, size, 0)
             frame_colour = (FRAME_COLOUR, position, size, 3)
             rec_in_highlight = (HIGHLIGHT_COLOUR, position, size, 5)
@@ -146,7 +323,7 @@ class Block:
         else:  # Recursive Call
             list_of_rec = []
             for child in self.children:
-                list_of_rec.extend(child.rectangles_to_draw())
+                list_of_rec.extend(child.rectangles_to_draw(area))
             if self.highlighted:
                 list_of_rec.append((HIGHLIGHT_COLOUR, position, size, 5))
             return list_of_rec
@@ -157,37 +334,35 @@ class Block:
         If <direction> is 1, swap vertically.  If <direction> is 0, swap
         horizontally. If this Block has no children, do nothing.
         """
-        if len(self.children) > 0:
+        self._resolve_ancestors()
+        if len(self._children) > 0:
             old = self.children
             if direction == 1:  # vertical swap
                 new_children = [old[3], old[2], old[1], old[0]]
             else:  # horizontal swap
                 new_children = [old[1], old[0], old[3], old[2]]
             self.children = new_children
-            self.update_block_locations(self.position, self.size)
+            self._record_change()
 
     def rotate(self, direction: int) -> None:
         """Rotate this Block and all its descendants.
 
         If <direction> is 1, rotate clockwise.  If <direction> is 3, rotate
         counterclockwise. If this Block has no children, do nothing.
+
+        The rotation is only recorded on this Block, and is applied to its
+        descendants as they are read through <children>.
         """
-        if len(self.children) == 0:  # rotating a solid block does nothing.
+        self._resolve_ancestors()
+        if len(self._children) == 0:  # rotating a solid block does nothing.
             pass
-        elif direction == 1:
-            for child in self.children:
-                child.rotate(direction)
-            old = self.children
-            new = [old[1], old[2], old[3], old[0]]
-            self.children = new
-            self.update_block_locations(self.position, self.size)
-        elif direction == 3:
-            for child in self.children:
-                child.rotate(direction)
-            old = self.children
-            new = [old[3], old[0], old[1], old[2]]
-            self.children = new
-            self.update_block_locations(self.position, self.size)
+        elif direction == 1 or direction == 3:
+            self._rotation = (self._rotation + direction) % 4
+            # The stored children are unchanged, so only the blocks
+            # containing this one need to forget their flattened form.
+            if self.parent is not None:
+                self.parent._mark_dirty()
+            self._record_change()
 
     def smash(self) -> bool:
         """Smash this block.
@@ -202,6 +377,7 @@ class Block:
 
         Return True if this Block was smashed and False otherwise.
         """
+        self._resolve_ancestors()
         if self.level == 0 or self.level == self.max_depth:
             return False
         else:
@@ -214,9 +390,194 @@ class Block:
             self.children = new_children
             self.colour = None
             set_parent(self, self.children)
-            self.update_block_locations(self.position, self.size)
+            self._record_change()
             return True
 
+    def _mark_dirty(self) -> None:
+        """Discard the cached flattened form and hash of this Block and of
+        every Block that contains it.
+
+        Blocks outside of this Block's parent chain keep their caches, so the
+        next call to flatten or board_hash only recomputes the part of the
+        board that changed.
+        """
+        block = self
+        while block is not None:
+            block._flattened = None
+            block._flattened_array = None
+            block._hashes = None
+            block = block.parent
+
+    def _record_change(self, moved: bool = True) -> None:
+        """Record on the root of this Block's board that this Block has
+        changed, and must be drawn again, if changed_areas has ever been
+        called on that root.
+
+        If <moved> is True, this Block was swapped, rotated or smashed, and
+        not just highlighted, so the structure_version of the board changes
+        as well.
+        """
+        state = self._board_state()
+        if state.watched:
+            state.changed[id(self)] = self
+        if moved:
+            state.version += 1
+
+    def structure_version(self) -> int:
+        """Return a number that changes whenever a block of the board that
+        this Block is part of is swapped, rotated or smashed.
+
+        The blocks found at each location of the board stay the same for as
+        long as this number does, so they can be looked up once and kept.
+        """
+        return self._board_state().version
+
+    def changed_areas(self) -> List[Tuple[float, float, float, float]]:
+        """Return the (x, y, width, height) on the screen of every Block of
+        this board that has been moved or highlighted since the last call,
+        and forget them.
+
+        A Block within another changed Block, or no longer on the board, is
+        left out, since it is drawn with the Block it is in, if at all.
+
+        Changes are only recorded once this has been called, so the first
+        call returns no areas, and a board that is never drawn, or drawn by
+        a NullRenderer, does not keep every Block that changed.
+
+        Precondition: this Block is the root of its board.
+        """
+        state = self._board_state()
+        changed = state.changed
+        state.changed = {}
+        state.watched = True
+        areas = []
+        for block in changed.values():
+            chain = []
+            ancestor = block
+            while ancestor.parent is not None and \
+                    id(ancestor.parent) not in changed and \
+                    any(child is ancestor
+                        for child in ancestor.parent._children):
+                ancestor = ancestor.parent
+                chain.append(ancestor)
+            if ancestor is self:
+                # Read the children of each ancestor from the root down, so
+                # that pending rotations and positions reach this Block.
+                for ancestor in reversed(chain):
+                    if ancestor._rotation != 0 or ancestor._layout_stale:
+                        ancestor._resolve()
+                areas.append((block.position[0], block.position[1],
+                              block.size, block.size))
+        return areas
+
+    def board_hash(self) -> int:
+        """Return a 64-bit hash of the unit cells of this Block.
+
+        Two Blocks with the same max_depth and level whose flattened forms
+        are equal have the same hash, even if they are subdivided
+        differently, and different ones almost surely have different hashes.
+        """
+        self._resolve_ancestors()
+        return self._stored_hashes()[self._rotation]
+
+    def rotated_hash(self, turns: int) -> int:
+        """Return the board_hash this Block would have after <turns>
+        clockwise quarter turns, without rotating it.
+        """
+        self._resolve_ancestors()
+        return self._stored_hashes()[(self._rotation + turns) % 4]
+
+    def _stored_hashes(self) -> Tuple[int, int, int, int]:
+        """Return the hash of the stored children of this Block after 0, 1,
+        2 and 3 clockwise quarter turns, computing it if it is not cached.
+        """
+        if self._hashes is None:
+            if len(self._children) == 0:
+                solid = solid_hash(colour_index(self.colour),
+                                   self.max_depth - self.level)
+                self._hashes = (solid, solid, solid, solid)
+            else:
+                hashes = []
+                for turns in range(4):
+                    # The same reordering and rotation of the children as
+                    # pushing <turns> down in _resolve would do.
+                    rotated = []
+                    for i in range(4):
+                        child = self._children[(i + turns) % 4]
+                        rotated.append(child._stored_hashes()[
+                            (child._rotation + turns) % 4])
+                    hashes.append(combine_hashes(rotated))
+                self._hashes = tuple(hashes)
+        return self._hashes
+
+    def push_move(self, option: int) -> None:
+        """Make the move <option> on this Block, as in perform_move, and
+        record it so that it can be undone with pop_move.
+
+        A smash is recorded with the blocks it discards, so it can be undone
+        as well.
+        """
+        smashed = None
+        if option == 4:
+            smashed = (self._children, self.colour, self._rotation)
+        path = block_path(self)
+        perform_move(self, option)
+        self._board_state().history.append((path, option, smashed))
+
+    def pop_move(self) -> None:
+        """Undo the most recent move recorded with push_move on the board
+        that this Block is part of.
+
+        Precondition: a move has been recorded with push_move on this board,
+        and not undone.  Any other moves made on the board since then have
+        been undone.
+        """
+        root = self.root()
+        path, option, smashed = root._board_state().history.pop()
+        block = follow_path(root, path)
+        if smashed is None:
+            undo_move(block, option)
+        else:
+            children, colour, rotation = smashed
+            block.children = children
+            block.colour = colour
+            block._rotation = rotation
+            block._record_change()
+
+    def root(self) -> 'Block':
+        """Return the root of the board that this Block is part of.
+        """
+        block = self
+        while block.parent is not None:
+            block = block.parent
+        return block
+
+    def _board_state(self) -> 'BoardState':
+        """Return the BoardState of the board that this Block is part of,
+        giving its root one if it has none yet.
+        """
+        root = self.root()
+        if root._state is None:
+            root._state = BoardState()
+        return root._state
+
+    def copy(self) -> 'Block':
+        """Return a copy of this Block and all of its descendants, with the
+        same positions, sizes and highlighting, as a new board of its own.
+
+        The copy has no parent and no recorded moves, and moves made on it do
+        not change this Block.
+        """
+        if len(self._children) == 0:
+            copy = Block(self.level, self.colour)
+        else:
+            copy = Block(self.level,
+                         children=[child.copy() for child in self.children])
+        copy.max_depth = self.max_depth
+        copy.update_block_locations(self.position, self.size)
+        copy.highlighted = self.highlighted
+        return copy
+
     def update_block_locations(self, top_left: Tuple[float, float],
                                size: float) -> None:
         """
@@ -227,14 +588,14 @@ class Block:
 
         <top_left> is the (x, y) coordinates of the top left corner of
         this Block.  <size> is the height and width of this Block.
+
+        The Blocks within this Block are updated lazily, the next time they
+        are reached through <children>.
         """
-        if len(self.children) == 0:
-            self.size = size
-            self.position = top_left
-        else:
-            self.size = size
-            self.position = top_left
-            self.update_child_block_locations(top_left, round(size / 2.0))
+        self.size = size
+        self.position = top_left
+        if len(self._children) > 0:
+            self._layout_stale = True
 
     def update_child_block_locations(self, top_left: Tuple[float, float],
                                      size: float) -> None:
@@ -247,13 +608,13 @@ class Block:
         low_left = (top_left[0], top_left[1] + size)
         low_right = (top_left[0] + size, top_left[1] + size)
         # Upper Right Block
-        self.children[0].update_block_locations(top_right, size)
+        self._children[0].update_block_locations(top_right, size)
         # Upper Left Block
-        self.children[1].update_block_locations(top_left, size)
+        self._children[1].update_block_locations(top_left, size)
         # Lower Left Block
-        self.children[2].update_block_locations(low_left, size)
-        #Lower Right BLock
-        self.children[3].update_block_locations(low_right, size)
+        self._children[2].update_block_locations(low_left, size)
+        # Lower Right BLock
+        self._children[3].update_block_locations(low_right, size)
 
     def get_selected_block(self, location: Tuple[float, float], level: int) \
             -> 'Block':
@@ -276,18 +637,22 @@ class Block:
             # Level greater than max_depth so we set it to max_depth
             level = self.max_depth
 
-        closest_distance = 100000
-        closest_block = self
-
-        for child in self.children:
-            curr = child.get_selected_block(location, level)
-            if curr.level <= level:
-                # our compare the distance with the center of the block
-                new_dist = get_distance(get_center(curr), location)
-                if new_dist < closest_distance:
-                    closest_distance = new_dist
-                    closest_block = curr
-        return closest_block
+        # Descend into the quadrant containing <location>, one level at a
+        # time.  A location outside of the Block falls into the nearest
+        # quadrant on that side.  Reading the children of each Block brings
+        # their positions up to date, so they are compared directly, and
+        # the whole descent takes O(max_depth) time.
+        self._resolve_ancestors()
+        block = self
+        while block.level < level and len(block.children) > 0:
+            upper_right, upper_left, lower_left, lower_right = block.children
+            on_right = location[0] >= upper_right._position[0]
+            on_bottom = location[1] >= lower_right._position[1]
+            if on_bottom:
+                block = lower_right if on_right else lower_left
+            else:
+                block = upper_right if on_right else upper_left
+        return block
 
     def flatten(self) -> List[List[Tuple[int, int, int]]]:
         """Return a two-dimensional list representing this Block as rows
@@ -300,75 +665,223 @@ class Block:
         of the block at the cell location[i][j]
 
         L[0][0] represents the unit cell in the upper left corner of the Block.
+
+        The result is cached on this Block until swap, rotate or smash changes
+        it or one of its descendants, so it must not be mutated by the caller.
+        """
+        self._resolve_ancestors()
+        return self._oriented_grid()
+
+    def _oriented_grid(self) -> List[List[Tuple[int, int, int]]]:
+        """This is a helper method for flatten, which flattens this Block
+            with its own pending rotation, but not those of the Blocks
+            containing it.
+        """
+        if self._flattened is None:
+            self._flattened = self._flatten_stored()
+        if self._rotation != 0:
+            return rotate_grid(self._flattened, self._rotation)
+        return self._flattened
+
+    def _flatten_stored(self) -> List[List[Tuple[int, int, int]]]:
+        """This is a helper method for flatten, which flattens this Block
+            from its stored children, without its pending rotation.
         """
         # base case has an extra condition for unit cell
-        if len(self.children) == 0:
+        if len(self._children) == 0:
             if self.level != self.max_depth:
                 sol = []
                 for _ in range(2 ** (self.max_depth - self.level)):
                     temp = [self.colour] * (2 ** (self.max_depth - self.level))
                     sol.append(temp)
-                return sol
             else:   # if the block is a unit cell
-                return [[self.colour]]
+                sol = [[self.colour]]
 
         else:
-            return combine_nested_list(self.flatten_child())
+            sol = combine_nested_list(self.flatten_child())
+
+        return sol
 
     def flatten_child(self) -> List[List[List[Tuple[int, int, int]]]]:
         """This is a helper method for flatten, which takes care of the
             recursive step, by calling the flatten method on all of a given
-            blocks children.
+            blocks stored children.
         """
-        childs = self.children
-        top_right = childs[0].flatten()
-        top_left = childs[1].flatten()
-        bot_left = childs[2].flatten()
-        bot_right = childs[3].flatten()
+        childs = self._children
+        top_right = childs[0]._oriented_grid()
+        top_left = childs[1]._oriented_grid()
+        bot_left = childs[2]._oriented_grid()
+        bot_right = childs[3]._oriented_grid()
         return [top_right, top_left, bot_left, bot_right]
 
+    def flatten_array(self) -> numpy.ndarray:
+        """Return a two-dimensional numpy array representing this Block as
+        columns and rows of unit cells.
 
-def combine_nested_list(childs: List) -> List:
+        The array A is indexed the same way as the list returned by flatten:
+        A[i, j] is the unit cell at column i and row j.  Each unit cell holds
+        the index of its colour in COLOUR_LIST, as a numpy.uint8.
+
+        Like flatten, the result is cached on this Block and is read-only.
+        """
+        self._resolve_ancestors()
+        return self._oriented_array()
+
+    def _oriented_array(self) -> numpy.ndarray:
+        """This is a helper method for flatten_array, which flattens this
+            Block with its own pending rotation, but not those of the Blocks
+            containing it.
+        """
+        if self._flattened_array is None:
+            self._flattened_array = self._flatten_stored_array()
+        if self._rotation != 0:
+            return rotate_array(self._flattened_array, self._rotation)
+        return self._flattened_array
+
+    def _flatten_stored_array(self) -> numpy.ndarray:
+        """This is a helper method for flatten_array, which flattens this
+            Block from its stored children, without its pending rotation.
+        """
+        size = 2 ** (self.max_depth - self.level)
+        if len(self._children) == 0:
+            sol = numpy.full((size, size), colour_index(self.colour),
+                             dtype=numpy.uint8)
+        else:
+            sol = numpy.empty((size, size), dtype=numpy.uint8)
+            half = size // 2
+            fill_quadrant(sol[half:, :half], self._children[0])
+            fill_quadrant(sol[:half, :half], self._children[1])
+            fill_quadrant(sol[:half, half:], self._children[2])
+            fill_quadrant(sol[half:, half:], self._children[3])
+
+        sol.flags.writeable = False
+        return sol
+
+
+class BoardState:
+    """What is kept about a board of Blocks as a whole, rather than about
+    any one of its Blocks.  Only the root Block of a board has one.
+
+    === Public Attributes ===
+    history:
+        The moves made on the board with push_move which have not been
+        undone with pop_move, oldest first.  Each is stored as the path to
+        the block it was made on, its option, and, for a smash, the children,
+        colour and pending rotation that the block had before, or else None.
+    changed:
+        The blocks of the board that have been moved or highlighted since
+        changed_areas was last called, by their id, so that only their part
+        of the screen is drawn again.
+    watched:
+        Whether changed_areas has been called on the board.  No changes are
+        recorded in <changed> before then, so a board that is never drawn
+        does not keep them.
+    version:
+        The number of times a block of the board has been swapped, rotated or
+        smashed.
     """
-    This is a helper for the flatten method. It takes, a list of lists
-    where the elements of the list correspond on the all the children on the
-    top right, top_left, bot_left, and bot_right respectively, and combines
-    them into one list.
+    history: List[Tuple[List[int], int, Optional[Tuple]]]
+    changed: Dict[int, Block]
+    watched: bool
+    version: int
+
+    def __init__(self) -> None:
+        """Initialize the state of a board on which nothing has happened.
+        """
+        self.history = []
+        self.changed = {}
+        self.watched = False
+        self.version = 0
+
+
+def fill_quadrant(quadrant: numpy.ndarray, child: Block) -> None:
     """
-    top_right = childs[0]
-    top_left = childs[1]
-    bot_left = childs[2]
-    bot_right = childs[3]
+    This is a helper for the flatten_array method. It copies the flattened
+    form of <child> into <quadrant>, which is a view into the parent's array.
+    A solid child is filled directly, without building an array for it.
+    """
+    if len(child._children) == 0:
+        quadrant[:, :] = colour_index(child.colour)
+    else:
+        quadrant[:, :] = child._oriented_array()
 
-    for i in range(len(top_right)):
-        top_left[i].extend(bot_left[i])
-    for i in range(len(top_right)):
-        top_right[i].extend(bot_right[i])
-    top_left.extend(top_right)
 
-    return top_left
+def mix_hash(value: int) -> int:
+    """
+    This is a helper for board_hash. It scrambles the bits of <value> into a
+    64-bit hash (using the finalizer of the splitmix64 generator).
+    """
+    value &= HASH_MASK
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & HASH_MASK
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & HASH_MASK
+    return value ^ (value >> 31)
+
+
+def combine_hashes(hashes: List[int]) -> int:
+    """
+    This is a helper for board_hash. It returns the hash of a block whose
+    upper-right, upper-left, lower-left and lower-right children have the
+    given <hashes>.
+    """
+    total = 0
+    for i in range(4):
+        total += hashes[i] * HASH_MULTIPLIERS[i]
+    return mix_hash(total)
 
 
-def get_center(block: 'Block') -> Tuple[float, float]:
+def solid_hash(colour: int, height: int) -> int:
     """
-    This is a helper method for the get selected_block method. It gives
-    the location of the center of the <block> and returns a tuple.
+    This is a helper for board_hash. It returns the hash of a solid block of
+    the colour at index <colour> in COLOUR_LIST, which is <height> levels
+    above the unit cells.  It is the hash of a block with four such children
+    one level down, so that how a block is subdivided does not matter.
     """
-    size = block.size / 2
-    return (block.position[0] + size, block.position[1] + size)
+    while len(SOLID_HASHES) <= height:
+        below = SOLID_HASHES[-1]
+        SOLID_HASHES.append([combine_hashes([h] * 4) for h in below])
+    return SOLID_HASHES[height][colour]
 
 
-def get_distance(block_pos, pointer_pos) -> float:
+def rotate_grid(grid: List[List], turns: int) -> List[List]:
     """
-    This is a helper method for get_selected_block which return the distance
-    between a the center of a block and the location of the mouse.<block_pos>:
-    is the position of the block, and pointer_pos is the postion of the mouse.
+    This is a helper for the flatten method. It returns a new flattened grid,
+    which is <grid> rotated clockwise by <turns> quarter turns.
     """
-    delta_distance_x = abs(block_pos[0] - pointer_pos[0]) ** 2
-    delta_distance_y = abs(block_pos[1] - pointer_pos[1]) ** 2
-    distance = math.sqrt(delta_distance_x + delta_distance_y)
+    for _ in range(turns):
+        grid = [list(row) for row in reversed(list(zip(*grid)))]
+    return grid
+
 
-    return distance
+def rotate_array(grid: numpy.ndarray, turns: int) -> numpy.ndarray:
+    """
+    This is a helper for the flatten_array method. It returns a new read-only
+    array, which is <grid> rotated clockwise by <turns> quarter turns.
+    """
+    rotated = numpy.ascontiguousarray(numpy.rot90(grid, turns))
+    rotated.flags.writeable = False
+    return rotated
+
+
+def combine_nested_list(childs: List) -> List:
+    """
+    This is a helper for the flatten method. It takes, a list of lists
+    where the elements of the list correspond on the all the children on the
+    top right, top_left, bot_left, and bot_right respectively, and combines
+    them into one new list. The lists in <childs> are not mutated, since they
+    may be cached by the children.
+    """
+    top_right = childs[0]
+    top_left = childs[1]
+    bot_left = childs[2]
+    bot_right = childs[3]
+
+    combined = []
+    for i in range(len(top_left)):
+        combined.append(top_left[i] + bot_left[i])
+    for i in range(len(top_right)):
+        combined.append(top_right[i] + bot_right[i])
+
+    return combined
 
 
 def random_init(level: int, max_depth: int) -> 'Block':
@@ -422,6 +935,98 @@ def set_parent(parent: 'Block', children: List['Block']) -> None:
         child.parent = parent
 
 
+def perform_move(block: 'Block', option: int) -> None:
+    """
+    This function makes a move on <block> based on the value of option:
+    0 and 1 are horizontal and vertical swaps, 2 and 3 are clockwise and
+    counterclockwise rotations, and 4 is a smash.
+
+    preconditions:
+        0 <= option <= 4
+    """
+    if option == 0:  # vertical swap
+        block.swap(0)
+    elif option == 1:  # horizontal swap
+        block.swap(1)
+    elif option == 2:  # rotate clockwise
+        block.rotate(1)
+    elif option == 3:  # rotate counter clockwise
+        block.rotate(3)
+    else:  # perform smash operation.
+        block.smash()
+
+
+def undo_move(board: 'Block', option: int):
+    """
+    Given a <board>, and a move represented by <option>, as in perform_move,
+    this function performs the opposite move to restore the board back to
+    its original state.
+
+    preconditions:
+        0 <= option <= 3
+    """
+    if option == 0:
+        perform_move(board, 0)
+    elif option == 1:
+        perform_move(board, 1)
+    elif option == 2:
+        perform_move(board, 3)
+    elif option == 3:
+        perform_move(board, 2)
+
+
+def cell_region(block: Block) -> Tuple[int, int, int]:
+    """
+    Return the (x, y) coordinates of the upper left unit cell of <block> on
+    its board, in unit cells rather than pixels, followed by its width in
+    unit cells.
+    """
+    if isinstance(block, Block):
+        block._resolve_ancestors()
+    x, y = 0, 0
+    child = block
+    parent = block.parent
+    while parent is not None:
+        slot = parent.children.index(child)
+        width = 2 ** (child.max_depth - child.level)
+        if slot == 0 or slot == 3:  # on the right of its parent
+            x += width
+        if slot == 2 or slot == 3:  # on the bottom of its parent
+            y += width
+        child = parent
+        parent = parent.parent
+    return x, y, 2 ** (block.max_depth - block.level)
+
+
+def block_path(block: Block) -> List[int]:
+    """
+    Return the indexes of the children to follow from the root of <block>'s
+    board to reach <block>, starting from the root.
+    """
+    if isinstance(block, Block):
+        block._resolve_ancestors()
+    path = []
+    child = block
+    parent = block.parent
+    while parent is not None:
+        path.append(parent.children.index(child))
+        child = parent
+        parent = parent.parent
+    path.reverse()
+    return path
+
+
+def follow_path(board: Block, path: List[int]) -> Block:
+    """
+    Return the Block reached by following the children at the indexes in
+    <path> from <board>, as returned by block_path.
+    """
+    block = board
+    for index in path:
+        block = block.children[index]
+    return block
+
+
 def attributes_str(b: Block, verbose) -> str:
     """Return a str that is a concise representation of the attributes of <b>.
 
@@ -473,7 +1078,7 @@ if __name__ == '__main__':
         'allowed-io': ['print_block_indented'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing',
-            'block', 'goal', 'player', 'renderer', 'math'
+            'block', 'goal', 'player', 'renderer', 'math', 'numpy'
         ],
         'max-attributes': 15
     })
@@ -0,0 +1,710 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains the CompactBoard class, an alternative to the Block class
+which stores a whole board in a few flat arrays instead of one object per
+block, and the CompactBlock class, which lets a block stored in a CompactBoard
+be used anywhere a Block is used.
+"""
+from typing import Dict, Optional, Tuple, List, Set
+from array import array
+import random
+import math
+import numpy
+from renderer import COLOUR_LIST, colour_index
+from block import Block, HIGHLIGHT_COLOUR, FRAME_COLOUR, combine_hashes, \
+    solid_hash
+
+# The value stored in the arrays of a CompactBoard where there is no node.
+NO_NODE = -1
+
+
+class CompactBoard:
+    """A Blocky board stored as a linear quadtree.
+
+    Every block of the board is a node, identified by its index in the
+    arrays below.  The root of the board is always node 0.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in the board.
+    position:
+        The (x, y) coordinates of the upper left corner of the board.
+    size:
+        The height and width of the board.
+    version:
+        The number of times the children of a node have been set, which
+        changes whenever a block of the board is swapped, rotated or smashed.
+
+    === Representation Invariants ===
+    - For every node i in use:
+        - _children[4 * i:4 * i + 4] are all NO_NODE iff _colour[i] != NO_NODE
+        - the children of node i, if any, are at level _level[i] + 1 and have
+          i as their parent
+        - _level[i] <= max_depth
+    - For every index i in _free, _level[i] == NO_NODE
+    """
+    max_depth: int
+    position: Tuple[int, int]
+    size: int
+    version: int
+    # === Private Attributes ===
+    # _level:
+    #     The level of each node.
+    # _colour:
+    #     The index in COLOUR_LIST of the colour of each leaf, or NO_NODE
+    #     for a node which is subdivided.
+    # _parent:
+    #     The parent of each node, or NO_NODE for the root.
+    # _children:
+    #     Four entries per node: its upper-right, upper-left, lower-left and
+    #     lower-right children, in the same order as Block.children.
+    # _highlighted:
+    #     The nodes which are highlighted.
+    # _free:
+    #     Indices of discarded nodes, to be reused before the arrays grow.
+    # _hashes:
+    #     The board_hash of some nodes after 0, 1, 2 and 3 clockwise quarter
+    #     turns, by node.  Whenever a node is in it, so are all of the nodes
+    #     below it.
+    _level: array
+    _colour: array
+    _parent: array
+    _children: array
+    _highlighted: Set[int]
+    _free: List[int]
+    _hashes: Dict[int, Tuple[int, int, int, int]]
+
+    def __init__(self, max_depth: int) -> None:
+        """Initialize this CompactBoard to be empty, with no nodes at all.
+
+        Use random_compact_init or compact_from_block to build a board.
+        """
+        self.max_depth = max_depth
+        self.position = (0, 0)
+        self.size = 0
+        self.version = 0
+        self._level = array('b')
+        self._colour = array('b')
+        self._parent = array('i')
+        self._children = array('i')
+        self._highlighted = set()
+        self._free = []
+        self._hashes = {}
+
+    def root(self) -> 'CompactBlock':
+        """Return the root block of this board."""
+        return CompactBlock(self, 0)
+
+    def num_nodes(self) -> int:
+        """Return the number of blocks currently in this board."""
+        return len(self._level) - len(self._free)
+
+    def _new_node(self, level: int, colour: int, parent: int) -> int:
+        """Add a node without children to this board and return its index.
+        """
+        if len(self._free) > 0:
+            node = self._free.pop()
+            self._level[node] = level
+            self._colour[node] = colour
+            self._parent[node] = parent
+        else:
+            node = len(self._level)
+            self._level.append(level)
+            self._colour.append(colour)
+            self._parent.append(parent)
+            self._children.extend([NO_NODE] * 4)
+        return node
+
+    def _set_children(self, node: int, children: List[int]) -> None:
+        """Make <children> the children of <node>, in Block.children order.
+        """
+        base = 4 * node
+        for i in range(4):
+            self._children[base + i] = children[i]
+            self._parent[children[i]] = node
+        self._colour[node] = NO_NODE
+        self.version += 1
+        # Forget the hashes of <node> and of the nodes above it.  They are
+        # already gone above the first node that has none.
+        while node != NO_NODE and node in self._hashes:
+            del self._hashes[node]
+            node = self._parent[node]
+
+    def _child_list(self, node: int) -> List[int]:
+        """Return the children of <node>, or an empty list for a leaf."""
+        if self._colour[node] != NO_NODE:
+            return []
+        base = 4 * node
+        return list(self._children[base:base + 4])
+
+    def _random_node(self, level: int, parent: int) -> int:
+        """Add a randomly generated subtree at <level> to this board and
+        return the index of its root.
+
+        The random numbers are drawn in the same order as random_init, so
+        the same seed gives the same board with either engine.
+        """
+        subdivide_constant = math.exp(-0.25 * level)
+        rand = random.random()
+
+        if rand >= subdivide_constant or level == self.max_depth:
+            return self._new_node(level, random.randint(0, 3), parent)
+        else:
+            node = self._new_node(level, NO_NODE, parent)
+            children = [self._random_node(level + 1, node) for _ in range(4)]
+            self._set_children(node, children)
+            return node
+
+    def _free_subtree(self, node: int) -> None:
+        """Discard all the descendants of <node>, leaving <node> itself."""
+        stack = self._child_list(node)
+        while len(stack) > 0:
+            curr = stack.pop()
+            stack.extend(self._child_list(curr))
+            base = 4 * curr
+            for i in range(4):
+                self._children[base + i] = NO_NODE
+            self._level[curr] = NO_NODE
+            self._highlighted.discard(curr)
+            self._hashes.pop(curr, None)
+            self._free.append(curr)
+
+    def _child_size(self, size: float) -> float:
+        """Return the size of the children of a block of <size>, rounded the
+        same way as Block.update_block_locations.
+        """
+        return round(size / 2.0)
+
+    def _hash(self, node: int, turns: int = 0) -> int:
+        """Return the board_hash of <node> after <turns> clockwise quarter
+        turns, the same as that of a Block with the same unit cells.
+
+        Hashes are cached until the children of the node, or of a node below
+        it, are set again.
+        """
+        if node not in self._hashes:
+            colour = self._colour[node]
+            if colour != NO_NODE:
+                solid = solid_hash(colour, self.max_depth - self._level[node])
+                self._hashes[node] = (solid, solid, solid, solid)
+            else:
+                children = self._child_list(node)
+                for child in children:
+                    self._hash(child)
+                self._hashes[node] = tuple(
+                    combine_hashes([self._hashes[children[(i + turns) % 4]]
+                                    [turns] for i in range(4)])
+                    for turns in range(4))
+        return self._hashes[node][turns]
+
+    def _locate(self, node: int) -> Tuple[Tuple[float, float], float]:
+        """Return the position and size of <node>, computed from the root.
+        """
+        # Record which child of its parent each block on the path is.
+        slots = []
+        curr = node
+        while self._parent[curr] != NO_NODE:
+            parent = self._parent[curr]
+            base = 4 * parent
+            slots.append(self._children[base:base + 4].index(curr))
+            curr = parent
+
+        (x, y), size = self.position, self.size
+        for slot in reversed(slots):
+            size = self._child_size(size)
+            x, y = child_position(x, y, size, slot)
+        return (x, y), size
+
+
+class CompactBlock:
+    """A block within a CompactBoard.
+
+    A CompactBlock has the same public attributes and methods as a Block, so
+    that Game, the players and the goals can use either one.  It holds no
+    state of its own: two CompactBlocks for the same node of the same board
+    are equal, and a new one may be returned every time a block is looked up.
+
+    === Public Attributes ===
+    board:
+        The CompactBoard this block is stored in.
+    index:
+        The index of this block's node in <board>.
+    """
+    board: CompactBoard
+    index: int
+
+    def __init__(self, board: CompactBoard, index: int) -> None:
+        """Initialize this CompactBlock for node <index> of <board>.
+        """
+        self.board = board
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether <other> is the same node of the same board."""
+        return isinstance(other, CompactBlock) and \
+            self.board is other.board and self.index == other.index
+
+    def __hash__(self) -> int:
+        """Return a hash consistent with __eq__."""
+        return hash((id(self.board), self.index))
+
+    @property
+    def level(self) -> int:
+        """The level of this block."""
+        return self.board._level[self.index]
+
+    @property
+    def max_depth(self) -> int:
+        """The deepest level allowed in the board."""
+        return self.board.max_depth
+
+    @property
+    def colour(self) -> Optional[Tuple[int, int, int]]:
+        """The colour of this block, or None if it is subdivided."""
+        colour = self.board._colour[self.index]
+        if colour == NO_NODE:
+            return None
+        return COLOUR_LIST[colour]
+
+    @property
+    def children(self) -> List['CompactBlock']:
+        """The blocks into which this block is subdivided, in the same order
+        as Block.children.
+        """
+        return [CompactBlock(self.board, child)
+                for child in self.board._child_list(self.index)]
+
+    @property
+    def parent(self) -> Optional['CompactBlock']:
+        """The block that this block is directly within."""
+        parent = self.board._parent[self.index]
+        if parent == NO_NODE:
+            return None
+        return CompactBlock(self.board, parent)
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        """The (x, y) coordinates of the upper left corner of this block."""
+        return self.board._locate(self.index)[0]
+
+    @property
+    def size(self) -> float:
+        """The height and width of this block."""
+        return self.board._locate(self.index)[1]
+
+    @property
+    def highlighted(self) -> bool:
+        """True iff the user has selected this block for action."""
+        return self.index in self.board._highlighted
+
+    @highlighted.setter
+    def highlighted(self, value: bool) -> None:
+        if value:
+            self.board._highlighted.add(self.index)
+        else:
+            self.board._highlighted.discard(self.index)
+
+    def update_block_locations(self, top_left: Tuple[float, float],
+                               size: float) -> None:
+        """Update the position and size of this block.
+
+        Only the position and size of the whole board are stored; those of
+        every other block are computed from them when they are read, so for
+        any other block this does nothing.
+        """
+        if self.index == 0:
+            self.board.position = top_left
+            self.board.size = size
+
+    def swap(self, direction: int) -> None:
+        """Swap the child blocks of this block.
+
+        If <direction> is 1, swap vertically.  If <direction> is 0, swap
+        horizontally. If this block has no children, do nothing.
+        """
+        old = self.board._child_list(self.index)
+        if len(old) > 0:
+            if direction == 1:  # vertical swap
+                new_children = [old[3], old[2], old[1], old[0]]
+            else:  # horizontal swap
+                new_children = [old[1], old[0], old[3], old[2]]
+            self.board._set_children(self.index, new_children)
+
+    def rotate(self, direction: int) -> None:
+        """Rotate this block and all its descendants.
+
+        If <direction> is 1, rotate clockwise.  If <direction> is 3, rotate
+        counterclockwise. If this block has no children, do nothing.
+        """
+        if direction != 1 and direction != 3:
+            return
+        board = self.board
+        stack = [self.index]
+        while len(stack) > 0:
+            node = stack.pop()
+            old = board._child_list(node)
+            if len(old) > 0:
+                if direction == 1:
+                    new = [old[1], old[2], old[3], old[0]]
+                else:
+                    new = [old[3], old[0], old[1], old[2]]
+                board._set_children(node, new)
+                stack.extend(new)
+
+    def smash(self) -> bool:
+        """Smash this block.
+
+        If this block can be smashed, randomly generate four new child blocks
+        for it, discarding any children it already had.
+
+        A block can be smashed iff it is not the top-level block and it
+        is not already at the level of the maximum depth.
+
+        Return True if this block was smashed and False otherwise.
+        """
+        if self.level == 0 or self.level == self.max_depth:
+            return False
+        board = self.board
+        board._free_subtree(self.index)
+        level = self.level + 1
+        # Same order of generation as Block.smash.
+        new_upper_left = board._random_node(level, self.index)
+        new_upper_right = board._random_node(level, self.index)
+        new_low_right = board._random_node(level, self.index)
+        new_low_left = board._random_node(level, self.index)
+        board._set_children(self.index, [new_upper_right, new_upper_left,
+                                         new_low_left, new_low_right])
+        return True
+
+    def board_hash(self) -> int:
+        """Return a 64-bit hash of the unit cells of this block, equal to the
+        Block.board_hash of a Block with the same unit cells.
+
+        Like a Block, a CompactBoard caches hashes, so this only visits the
+        nodes that changed since the last call.
+        """
+        return self.board._hash(self.index)
+
+    def rotated_hash(self, turns: int) -> int:
+        """Return the board_hash this block would have after <turns>
+        clockwise quarter turns, without rotating it.
+        """
+        return self.board._hash(self.index, turns % 4)
+
+    def rectangles_to_draw(self) -> List[Tuple[Tuple[int, int, int],
+                                               Tuple[float, float],
+                                               Tuple[float, float],
+                                               int]]:
+        """Return a list of tuples describing all of the rectangles to be
+        drawn in order to render this block, in the same format as
+        Block.rectangles_to_draw.
+        """
+        board = self.board
+        rectangles = []
+        position, size = board._locate(self.index)
+        stack = [(self.index, position, size)]
+        while len(stack) > 0:
+            node, (x, y), size = stack.pop()
+            rec_pos = (float(x), float(y))
+            rec_size = (float(size), float(size))
+            colour = board._colour[node]
+            if colour != NO_NODE:
+                rectangles.append((COLOUR_LIST[colour], rec_pos, rec_size, 0))
+                rectangles.append((FRAME_COLOUR, rec_pos, rec_size, 3))
+            else:
+                child_size = board._child_size(size)
+                base = 4 * node
+                for slot in range(4):
+                    stack.append((board._children[base + slot],
+                                  child_position(x, y, child_size, slot),
+                                  child_size))
+            if node in board._highlighted:
+                rectangles.append((HIGHLIGHT_COLOUR, rec_pos, rec_size, 5))
+        return rectangles
+
+    def structure_version(self) -> int:
+        """Return a number that changes whenever a block of this board is
+        swapped, rotated or smashed, as in Block.structure_version.
+        """
+        return self.board.version
+
+    def changed_areas(self) -> List[Tuple[float, float, float, float]]:
+        """Return the (x, y, width, height) on the screen of the parts of
+        this board that must be drawn again, as in Block.changed_areas.
+
+        A CompactBoard does not record which blocks have changed, so this is
+        always the whole board.
+        """
+        (x, y), size = self.board._locate(self.index)
+        return [(x, y, size, size)]
+
+    def get_selected_block(self, location: Tuple[float, float], level: int) \
+            -> 'CompactBlock':
+        """Return the block within this block that includes the given
+        location and is at the given level, as in Block.get_selected_block.
+        """
+        board = self.board
+        level = min(level, board.max_depth)
+        node = self.index
+        (x, y), size = board._locate(node)
+        while board._level[node] < level and board._colour[node] == NO_NODE:
+            size = board._child_size(size)
+            on_right = location[0] >= x + size
+            on_bottom = location[1] >= y + size
+            if on_bottom:
+                slot = 3 if on_right else 2
+            else:
+                slot = 0 if on_right else 1
+            x, y = child_position(x, y, size, slot)
+            node = board._children[4 * node + slot]
+        return CompactBlock(board, node)
+
+    def flatten_array(self) -> numpy.ndarray:
+        """Return this block as a two-dimensional numpy array of indices into
+        COLOUR_LIST, in the same format as Block.flatten_array.
+        """
+        board = self.board
+        size = 2 ** (board.max_depth - self.level)
+        grid = numpy.empty((size, size), dtype=numpy.uint8)
+        stack = [(self.index, 0, 0, size)]
+        while len(stack) > 0:
+            node, x, y, size = stack.pop()
+            colour = board._colour[node]
+            if colour != NO_NODE:
+                grid[x:x + size, y:y + size] = colour
+            else:
+                half = size // 2
+                base = 4 * node
+                for slot in range(4):
+                    cx, cy = child_position(x, y, half, slot)
+                    stack.append((board._children[base + slot], cx, cy, half))
+        grid.flags.writeable = False
+        return grid
+
+    def flatten(self) -> List[List[Tuple[int, int, int]]]:
+        """Return this block as a two-dimensional list of colours, in the
+        same format as Block.flatten.
+        """
+        return [[COLOUR_LIST[colour] for colour in column]
+                for column in self.flatten_array().tolist()]
+
+
+def child_position(x: float, y: float, child_size: float, slot: int) \
+        -> Tuple[float, float]:
+    """
+    This is a helper function which returns the position of the child in
+    <slot> of Block.children order, for a block at (<x>, <y>) whose children
+    have size <child_size>.
+    """
+    if slot == 0:  # upper right
+        return x + child_size, y
+    elif slot == 1:  # upper left
+        return x, y
+    elif slot == 2:  # lower left
+        return x, y + child_size
+    else:  # lower right
+        return x + child_size, y + child_size
+
+
+def random_compact_init(max_depth: int) -> CompactBlock:
+    """Return the root of a randomly-generated CompactBoard subdivided to a
+    maximum depth of <max_depth>.
+
+    The board is generated exactly like random_init(0, max_depth) would
+    generate it, given the same state of the random module.
+    """
+    board = CompactBoard(max_depth)
+    board._random_node(0, NO_NODE)
+    return board.root()
+
+
+def compact_from_block(block: Block) -> CompactBlock:
+    """Return the root of a new CompactBoard holding the same board as the
+    root Block <block>, including its position, size and highlighting.
+    """
+    board = CompactBoard(block.max_depth)
+    board.position = block.position
+    board.size = block.size
+    copy_block(board, block, NO_NODE)
+    return board.root()
+
+
+def copy_block(board: CompactBoard, block: Block, parent: int) -> int:
+    """
+    This is a helper function for compact_from_block, which adds a copy of
+    <block> and all of its descendants to <board> as a child of <parent>, and
+    returns the index of the new node.
+    """
+    if len(block.children) == 0:
+        node = board._new_node(block.level, colour_index(block.colour), parent)
+    else:
+        node = board._new_node(block.level, NO_NODE, parent)
+        board._set_children(node, [copy_block(board, child, node)
+                                   for child in block.children])
+    if block.highlighted:
+        board._highlighted.add(node)
+    return node
+
+
+def block_from_compact(block: CompactBlock) -> Block:
+    """Return a new root Block holding the same board as the root
+    CompactBlock <block>, including its position, size and highlighting.
+
+    This is the inverse of compact_from_block.
+    """
+    board = copy_node(block.board, 0)
+    board.update_block_locations(block.position, block.size)
+    return board
+
+
+def copy_node(board: CompactBoard, node: int) -> Block:
+    """
+    This is a helper function for block_from_compact, which returns a new
+    Block holding a copy of the node <node> of <board> and all of its
+    descendants.
+    """
+    colour = board._colour[node]
+    if colour == NO_NODE:
+        block = Block(board._level[node], None,
+                      [copy_node(board, child)
+                       for child in board._child_list(node)])
+    else:
+        block = Block(board._level[node], COLOUR_LIST[colour])
+    block.max_depth = board.max_depth
+    block.highlighted = node in board._highlighted
+    return block
+
+
+def random_nodes(count: int, max_depth: int,
+                 rng: numpy.random.Generator) -> Tuple[numpy.ndarray, ...]:
+    """
+    This is a helper function for random_compact_boards and random_grids.
+    Generate <count> random boards of <max_depth> with the same distribution
+    as random_init(0, max_depth), one level at a time, drawing the random
+    numbers for all of the blocks of a level at once from <rng>.
+
+    Return one array per attribute of the blocks, each with one entry per
+    block of every board, in order of level: the board it is in, its level,
+    the index of its colour or NO_NODE if it is subdivided, the position in
+    these arrays of its parent or NO_NODE, which child of its parent it is,
+    and the column and row of its upper left unit cell.
+    """
+    boards = [numpy.arange(count)]
+    levels = [numpy.zeros(count, dtype=numpy.int64)]
+    colours = []
+    parents = [numpy.full(count, NO_NODE)]
+    slots = [numpy.zeros(count, dtype=numpy.int64)]
+    xs = [numpy.zeros(count, dtype=numpy.int64)]
+    ys = [numpy.zeros(count, dtype=numpy.int64)]
+    first = 0  # the position in the arrays of the first block of this level
+    for level in range(max_depth + 1):
+        board, x, y = boards[-1], xs[-1], ys[-1]
+        blocks = len(board)
+        split = rng.random(blocks) < math.exp(-0.25 * level)
+        if level == max_depth:
+            split[:] = False
+        colour = rng.integers(0, len(COLOUR_LIST), blocks)
+        colours.append(numpy.where(split, NO_NODE, colour))
+        parent = numpy.flatnonzero(split)
+        if len(parent) == 0:
+            break
+
+        # Four children for each subdivided block, in Block.children order.
+        half = 2 ** (max_depth - level - 1)
+        slot = numpy.tile(numpy.arange(4), len(parent))
+        parent = numpy.repeat(parent, 4)
+        boards.append(board[parent])
+        levels.append(numpy.full(len(parent), level + 1))
+        parents.append(parent + first)
+        slots.append(slot)
+        xs.append(x[parent] + half * ((slot == 0) | (slot == 3)))
+        ys.append(y[parent] + half * (slot >= 2))
+        first += blocks
+    return tuple(numpy.concatenate(column) for column in
+                 [boards, levels, colours, parents, slots, xs, ys])
+
+
+def random_compact_boards(count: int, max_depth: int,
+                          seed: Optional[int] = None) -> List[CompactBlock]:
+    """Return the roots of <count> randomly-generated CompactBoards, each
+    subdivided to a maximum depth of <max_depth>.
+
+    The boards have the same distribution as those of random_compact_init,
+    but the random numbers are drawn from numpy in bulk, so the same <seed>
+    always gives the same boards, but not the same as random_compact_init.
+    """
+    board, level, colour, parent, slot, _, _ = random_nodes(
+        count, max_depth, numpy.random.default_rng(seed))
+
+    # Sort the blocks by board, keeping each board's blocks in level order,
+    # so that every board is one slice with its root first.
+    order = numpy.argsort(board, kind='stable')
+    position = numpy.empty(len(order), dtype=numpy.int64)
+    position[order] = numpy.arange(len(order))
+    starts = numpy.searchsorted(board[order], numpy.arange(count + 1))
+    local = position - starts[board]
+
+    new_parent = numpy.where(parent == NO_NODE, NO_NODE, local[parent])
+    children = numpy.full(4 * len(order), NO_NODE)
+    has_parent = parent != NO_NODE
+    children[4 * position[parent[has_parent]] + slot[has_parent]] = \
+        local[has_parent]
+
+    level = level[order].astype(numpy.int8)
+    colour = colour[order].astype(numpy.int8)
+    new_parent = new_parent[order].astype(numpy.int32)
+    children = children.astype(numpy.int32)
+    roots = []
+    for i in range(count):
+        start, end = starts[i], starts[i + 1]
+        compact = CompactBoard(max_depth)
+        compact._level = array('b', level[start:end].tobytes())
+        compact._colour = array('b', colour[start:end].tobytes())
+        compact._parent = array('i', new_parent[start:end].tobytes())
+        compact._children = array('i', children[4 * start:4 * end].tobytes())
+        roots.append(compact.root())
+    return roots
+
+
+def random_grids(count: int, max_depth: int,
+                 seed: Optional[int] = None) -> numpy.ndarray:
+    """Return <count> randomly-generated boards subdivided to a maximum depth
+    of <max_depth>, in their flattened form, stacked in one array as in
+    env.VecBlockyEnv.
+
+    The boards have the same distribution as those of random_init, and are
+    generated as by random_compact_boards, so the same <seed> gives the
+    flattened forms of the same boards.
+    """
+    board, level, colour, _, _, x, y = random_nodes(
+        count, max_depth, numpy.random.default_rng(seed))
+    width = 2 ** max_depth
+    grids = numpy.empty((count, width, width), dtype=numpy.uint8)
+    for depth in range(max_depth + 1):
+        leaves = (level == depth) & (colour != NO_NODE)
+        size = 2 ** (max_depth - depth)
+        cells = numpy.arange(size)
+        grids[board[leaves].reshape(-1, 1, 1),
+              x[leaves].reshape(-1, 1, 1) + cells.reshape(1, -1, 1),
+              y[leaves].reshape(-1, 1, 1) + cells.reshape(1, 1, -1)] = \
+            colour[leaves].reshape(-1, 1, 1)
+    return grids
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', 'array', 'math',
+            'block', 'goal', 'player', 'renderer', 'numpy'
+        ],
+        'max-attributes': 15
+    })
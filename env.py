@@ -0,0 +1,317 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains step-by-step environments for simulating games of Blocky
+without drawing them: BlockyEnv plays one game on a Block, and VecBlockyEnv
+plays many games at once on boards stored as stacked numpy arrays.
+
+In both, a move is an int from the moves module, and is made by the player
+whose turn it is.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+import numpy
+from block import Block, rotate_array
+from compact_block import random_grids
+from game import Game
+from goal import Goal, blob_scores, perimeter_scores
+from moves import make_move, encode_move, decode_move
+
+
+class BlockyEnv:
+    """A game of Blocky that is played one move at a time.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in the board.
+    num_players:
+        The number of players, who take turns making moves.
+    num_turns:
+        The number of turns each player gets.
+    board:
+        The board of the current game, or None before reset is called.
+    goals:
+        The goal of each player in the current game.
+    turn:
+        The number of moves made so far in the current game.
+
+    === Representation Invariants ===
+    - num_players >= 1
+    - 0 <= turn <= num_players * num_turns
+    """
+    max_depth: int
+    num_players: int
+    num_turns: int
+    board: Optional[Block]
+    goals: List[Goal]
+    turn: int
+
+    def __init__(self, max_depth: int, num_players: int,
+                 num_turns: int) -> None:
+        """Initialize this environment for games of <num_turns> turns each
+        between <num_players> players, on boards of <max_depth>.
+
+        Call reset to start the first game.
+        """
+        self.max_depth = max_depth
+        self.num_players = num_players
+        self.num_turns = num_turns
+        self.board = None
+        self.goals = []
+        self.turn = 0
+
+    def reset(self, seed: Optional[int] = None) -> numpy.ndarray:
+        """Start a new game, with the random module seeded with <seed> if it
+        is not None, and return its flattened board.
+
+        The board and the players' goals are generated the same way as by a
+        headless Game.
+        """
+        if seed is not None:
+            random.seed(seed)
+        game = Game(self.max_depth, 0, self.num_players, [], headless=True)
+        self.board = game.board
+        self.goals = [player.goal for player in game.players]
+        self.turn = 0
+        return self.board.flatten_array()
+
+    def current_player(self) -> int:
+        """Return the index of the player who makes the next move."""
+        return self.turn % self.num_players
+
+    def step(self, move: int) -> Tuple[numpy.ndarray, List[int], bool]:
+        """Make the int <move> from the moves module for the current player.
+
+        Return the flattened board, the score of every player and whether the
+        game is over.
+
+        Precondition: the game is not over, and <move> is a move on a block
+        of the board.
+        """
+        make_move(self.board, move)
+        self.turn += 1
+        scores = [goal.score(self.board) for goal in self.goals]
+        done = self.turn >= self.num_players * self.num_turns
+        return self.board.flatten_array(), scores, done
+
+
+class VecBlockyEnv:
+    """Many games of Blocky played side by side, one move at a time.
+
+    Every board is stored as its flattened form, as returned by
+    Block.flatten_array, stacked in one numpy array.  A move is made on all of
+    the boards at once, by moving the unit cells of the block it is made on
+    with numpy; its position within the board is given by the path in the
+    move.  Since a move on a block of a single colour changes nothing, the
+    boards behave just as Blocks would, except that smashes are not allowed.
+
+    === Public Attributes ===
+    num_boards:
+        The number of games played at once.
+    max_depth:
+        The deepest level allowed in the boards.
+    num_players:
+        The number of players in each game, who take turns making moves.
+    num_turns:
+        The number of turns each player gets.
+    grids:
+        The boards, with grids[i] the flattened board of game i, or None
+        before reset is called.
+    blob_goals:
+        blob_goals[i, p] is True iff player p of game i has a BlobGoal, and
+        not a PerimeterGoal.
+    targets:
+        targets[i, p] is the index in COLOUR_LIST of the colour of the goal
+        of player p in game i.
+    turn:
+        The number of moves made so far in every game.
+
+    === Representation Invariants ===
+    - num_boards >= 1 and num_players >= 1
+    - 0 <= turn <= num_players * num_turns
+    """
+    num_boards: int
+    max_depth: int
+    num_players: int
+    num_turns: int
+    grids: Optional[numpy.ndarray]
+    blob_goals: Optional[numpy.ndarray]
+    targets: Optional[numpy.ndarray]
+    turn: int
+    # === Private Attributes ===
+    # _permutations:
+    #     For each move that has been made, the position in the flattened
+    #     board before the move of the unit cell at each position after it.
+    # _all_moves:
+    #     Every swap and rotation of a block that can be subdivided, on a
+    #     board where every such block is.
+    # _rng:
+    #     The numpy random number generator used by random_moves.
+    _permutations: Dict[int, numpy.ndarray]
+    _all_moves: numpy.ndarray
+    _rng: numpy.random.Generator
+
+    def __init__(self, num_boards: int, max_depth: int, num_players: int,
+                 num_turns: int) -> None:
+        """Initialize this environment for <num_boards> games at once, of
+        <num_turns> turns each between <num_players> players, on boards of
+        <max_depth>.
+
+        Call reset to start the first games.
+        """
+        self.num_boards = num_boards
+        self.max_depth = max_depth
+        self.num_players = num_players
+        self.num_turns = num_turns
+        self.grids = None
+        self.blob_goals = None
+        self.targets = None
+        self.turn = 0
+        self._permutations = {}
+        self._all_moves = numpy.array(all_moves(max_depth), dtype=numpy.int64)
+        self._rng = numpy.random.default_rng()
+
+    def reset(self, seed: Optional[int] = None) -> numpy.ndarray:
+        """Start new games, with the boards, the random module and
+        random_moves seeded with <seed> if it is not None, and return their
+        flattened boards.
+
+        The boards are generated all at once by random_grids, and each
+        player's goal is chosen the same way as by a Game.
+        """
+        if seed is not None:
+            random.seed(seed)
+        self._rng = numpy.random.default_rng(seed)
+        self.grids = random_grids(self.num_boards, self.max_depth, seed)
+        self.targets = numpy.empty((self.num_boards, self.num_players),
+                                   dtype=numpy.uint8)
+        self.blob_goals = numpy.empty((self.num_boards, self.num_players),
+                                      dtype=bool)
+        for game in range(self.num_boards):
+            for player in range(self.num_players):
+                self.targets[game, player] = random.randint(0, 3)
+                self.blob_goals[game, player] = random.randint(0, 1) == 0
+        self.turn = 0
+        return self.grids
+
+    def current_player(self) -> int:
+        """Return the index of the player who makes the next move in every
+        game."""
+        return self.turn % self.num_players
+
+    def random_moves(self) -> numpy.ndarray:
+        """Return one swap or rotation for each game, chosen uniformly at
+        random among the blocks of a fully subdivided board.
+        """
+        return self._rng.choice(self._all_moves, self.num_boards)
+
+    def step(self, moves: numpy.ndarray) -> Tuple[numpy.ndarray,
+                                                  numpy.ndarray, bool]:
+        """Make the int moves[i] from the moves module for the current player
+        of game i, for every game.
+
+        Return the flattened boards, the score of every player of every game,
+        with scores[i, p] the score of player p in game i, and whether the
+        games are over.
+
+        Precondition: the games are not over, and no move is a smash.
+        """
+        permutations = numpy.stack([self._permutation(int(move))
+                                    for move in moves])
+        cells = self.grids.reshape(self.num_boards, -1)
+        self.grids = numpy.take_along_axis(cells, permutations, axis=1) \
+            .reshape(self.grids.shape)
+        self.turn += 1
+        done = self.turn >= self.num_players * self.num_turns
+        return self.grids, self.scores(), done
+
+    def scores(self) -> numpy.ndarray:
+        """Return the score of every player of every game, with scores[i, p]
+        the score of player p in game i.
+
+        The boards are scored together, by goal type, for each player.
+        """
+        scores = numpy.zeros((self.num_boards, self.num_players), dtype=int)
+        for player in range(self.num_players):
+            blob = self.blob_goals[:, player]
+            perimeter = ~blob
+            if blob.any():
+                scores[blob, player] = blob_scores(
+                    self.grids[blob], self.targets[blob, player])
+            if perimeter.any():
+                scores[perimeter, player] = perimeter_scores(
+                    self.grids[perimeter], self.targets[perimeter, player])
+        return scores
+
+    def _permutation(self, move: int) -> numpy.ndarray:
+        """Return the position in a flattened board before <move> of the
+        unit cell at each position after it, as a flat array.
+
+        Permutations are computed once per move and kept.
+        """
+        if move not in self._permutations:
+            self._permutations[move] = move_permutation(move, self.max_depth)
+        return self._permutations[move]
+
+
+def move_permutation(move: int, max_depth: int) -> numpy.ndarray:
+    """
+    This is a helper function for VecBlockyEnv. Return the position in a
+    flattened board of <max_depth> before the int <move> of the unit cell at
+    each position after it, as a flat array.
+
+    Precondition: <move> is not a smash.
+    """
+    path, option = decode_move(move)
+    size = 2 ** max_depth
+    x, y, width = 0, 0, size
+    for index in path:
+        width //= 2
+        if index == 0 or index == 3:  # on the right of its parent
+            x += width
+        if index == 2 or index == 3:  # on the bottom of its parent
+            y += width
+
+    positions = numpy.arange(size * size).reshape(size, size)
+    block = positions[x:x + width, y:y + width]
+    if option == 0:  # horizontal swap: the left and right halves trade places
+        moved = numpy.roll(block, width // 2, axis=0)
+    elif option == 1:  # vertical swap: the top and bottom halves trade places
+        moved = numpy.roll(block, width // 2, axis=1)
+    elif option == 2:
+        moved = rotate_array(block, 1)
+    else:
+        moved = rotate_array(block, 3)
+    positions[x:x + width, y:y + width] = moved
+    return positions.ravel()
+
+
+def all_moves(max_depth: int) -> List[int]:
+    """
+    This is a helper function for VecBlockyEnv, which returns every swap and
+    rotation of every block that can be subdivided on a board of <max_depth>.
+    """
+    moves = []
+    paths = [[]]
+    for _ in range(max_depth):
+        for path in paths:
+            moves.extend(encode_move(path, option) for option in range(4))
+        paths = [path + [index] for path in paths for index in range(4)]
+    return moves
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', 'numpy',
+            'block', 'compact_block', 'game', 'goal', 'moves'
+        ],
+    })
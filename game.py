@@ -15,11 +15,13 @@ At the bottom of the file, there are some function that you
 can call to try playing the game in several different configurations.
 """
 import random
-from typing import List
+from typing import List, Optional
 from block import Block, random_init
+from compact_block import random_compact_init
 from goal import BlobGoal, PerimeterGoal
 from player import Player, HumanPlayer, RandomPlayer, SmartPlayer
-from renderer import Renderer, COLOUR_LIST, colour_name, BOARD_WIDTH
+from renderer import Renderer, ArrayRenderer, NullRenderer, COLOUR_LIST, \
+    colour_name, BOARD_WIDTH
 
 
 class Game:
@@ -28,11 +30,15 @@ class Game:
     === Public Attributes ===
     board:
         The Blocky board on which this game will be played.
+        This is a Block, or a CompactBlock if the game stores its board
+        in a CompactBoard.
     renderer:
         The object that is capable of drawing our Blocky board on the screen,
         and tracking user interactions with the Blocky board.
     players:
         The entities that are playing this game.
+    moves_made:
+        The number of turns so far in which a player changed the board.
 
     === Representation Invariants ===
     - len(players) >= 1
@@ -40,22 +46,56 @@ class Game:
     board: Block
     renderer: Renderer
     players: List[Player]
+    moves_made: int
 
     def __init__(self, max_depth: int,
                  num_human: int,
                  random_players: int,
-                 smart_players: List[int]) -> None:
+                 smart_players: List[int],
+                 compact: bool = False,
+                 headless: bool = False,
+                 processes: int = 0,
+                 time_budget: Optional[int] = None,
+                 array_renderer: bool = False) -> None:
         """Initialize this game, as described in the Assignment 2 handout.
 
+        If <compact> is True, store the board in a CompactBoard rather than
+        in one Block per block, which uses much less memory on deep boards.
+
+        If <headless> is True, use a NullRenderer: nothing is drawn, the
+        players' goals are not shown, and computer players do not pause
+        between moves.
+
+        If <processes> is positive, each SmartPlayer scores its candidate
+        moves on that many worker processes.
+
+        If <time_budget> is not None, each SmartPlayer instead tries as many
+        moves as it can in that many milliseconds, whatever its difficulty.
+
+        If <array_renderer> is True, draw the board with an ArrayRenderer,
+        whose drawing time does not grow with the number of blocks.
+
         Precondition:
-            2 <= max_depth <= 5
+            2 <= max_depth <= 5, or 2 <= max_depth if <compact> is True
+            num_human == 0 if <headless> is True
         """
         num_of_players = num_human + random_players + len(smart_players)
 
         self.max_depth = max_depth
-        self.renderer = Renderer(num_of_players)
-        self.board = random_init(0, max_depth)
+        if headless:
+            self.renderer = NullRenderer(num_of_players)
+        elif array_renderer:
+            self.renderer = ArrayRenderer(num_of_players)
+        else:
+            self.renderer = Renderer(num_of_players)
+        if compact:
+            self.board = random_compact_init(max_depth)
+        else:
+            self.board = random_init(0, max_depth)
         self.board.update_block_locations((0, 0), BOARD_WIDTH)
+        self.processes = processes
+        self.time_budget = time_budget
+        self.moves_made = 0
         self.players = self._list_of_players(num_human, random_players,
                                              smart_players)
         self.renderer.draw(self.board, 0)
@@ -75,7 +115,8 @@ class Game:
                 goal = BlobGoal(rand_colour)
             else:
                 goal = PerimeterGoal(rand_colour)
-            new_player = SmartPlayer(self.renderer, 0, goal, difficulty)
+            new_player = SmartPlayer(self.renderer, 0, goal, difficulty,
+                                     self.processes, self.time_budget)
             all_smart_players.append(new_player)
 
         return all_smart_players
@@ -109,7 +150,7 @@ class Game:
                 HumanPlayer(self.renderer, 0, rand_goal))
         return all_human_players
 
-    def run_game(self, num_turns: int) -> None:
+    def run_game(self, num_turns: int, verbose: bool = True) -> List[int]:
         """Run the game for the number of turns specified.
 
         Each player gets <num_turns> turns. The first player in self.players
@@ -122,35 +163,43 @@ class Game:
 
         When the game is over, print who won to the console.
 
+        If <verbose> is False, print nothing at all.
+
+        Return the final score of each player, in the order of self.players.
         """
         # Index within self.players of the current player.
         index = 0
         for turn in range(num_turns * len(self.players)):
             player = self.players[index]
-            print(f'Player {player.id}, turn {turn}')
+            if verbose:
+                print(f'Player {player.id}, turn {turn}')
+            before = self.board.board_hash()
             if self.players[index].make_move(self.board) == 1:
                 break
             else:
-                print(f'Player {player.id} CURRENT SCORE: ' +
-                      f'{player.goal.score(self.board)}')
+                if self.board.board_hash() != before:
+                    self.moves_made += 1
+                if verbose:
+                    print(f'Player {player.id} CURRENT SCORE: ' +
+                          f'{player.goal.score(self.board)}')
                 index = (index + 1) % len(self.players)
+        for player in self.players:
+            player.close()
 
         # Determine and report the winner.
 
-        max_score = 0
-        winning_player = 0
-        for i in range(len(self.players)):
-            score = self.players[i].goal.score(self.board)
-            print(f'Player {i} : {score}')
-            if score > max_score:
-                max_score = score
-                winning_player = i
-        print(f'WINNER is Player {winning_player}!')
-        print('Players had these goals:')
-        for player in self.players:
-            print(f'Player {player.id} ' +
-                  f'goal = \n\t{player.goal.description()}: ' +
-                  f'{colour_name(player.goal.colour)}')
+        scores = [player.goal.score(self.board) for player in self.players]
+        winning_player = find_winner(scores)
+        if verbose:
+            for i in range(len(self.players)):
+                print(f'Player {i} : {scores[i]}')
+            print(f'WINNER is Player {winning_player}!')
+            print('Players had these goals:')
+            for player in self.players:
+                print(f'Player {player.id} ' +
+                      f'goal = \n\t{player.goal.description()}: ' +
+                      f'{colour_name(player.goal.colour)}')
+        return scores
 
     def _list_of_players(self, num_human: int, num_random: int,
                          smart_players: List[int]) -> List['Player']:
@@ -167,6 +216,21 @@ class Game:
         return players
 
 
+def find_winner(scores: List[int]) -> int:
+    """
+    Return the index of the winning player, given the final <scores> of all
+    players.  Ties go to the player who moved first, and player 0 wins if
+    nobody scored.
+    """
+    max_score = 0
+    winning_player = 0
+    for i in range(len(scores)):
+        if scores[i] > max_score:
+            max_score = scores[i]
+            winning_player = i
+    return winning_player
+
+
 def set_player_id(list_of_players: List['Player']) -> None:
     """
     This is a helper method for _list_of_players, which completes the task of
@@ -187,6 +251,14 @@ def auto_game() -> None:
     game.run_game(10)
 
 
+def headless_auto_game() -> None:
+    """Run the same game as auto_game, without drawing it.
+    """
+    random.seed(1001)
+    game = Game(4, 0, 0, [1, 6], headless=True)
+    game.run_game(10)
+
+
 def two_player_game() -> None:
     """Run a game with two human players.
     """
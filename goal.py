@@ -11,8 +11,11 @@ University of Toronto
 This file contains the Goal class hierarchy.
 """
 
-from typing import List, Tuple
-from block import Block
+from typing import Dict, List, Optional, Tuple, Union
+from collections import OrderedDict
+import numpy
+from block import Block, perform_move, undo_move, cell_region
+from renderer import COLOUR_LIST, colour_index
 
 
 class Goal:
@@ -25,20 +28,83 @@ class Goal:
         The target colour for this goal, that is the colour to which
         this goal applies.
     """
+    # === Private Attributes ===
+    # _score_cache:
+    #     The most recently computed scores, keyed by the board_hash of the
+    #     board they were computed on, from least to most recently used.
+
+    # The number of scores kept in _score_cache.
+    SCORE_CACHE_SIZE = 1024
+
     colour: Tuple[int, int, int]
+    _score_cache: 'OrderedDict[int, int]'
 
     def __init__(self, target_colour: Tuple[int, int, int]) -> None:
         """Initialize this goal to have the given target colour.
         """
         self.colour = target_colour
+        self._score_cache = OrderedDict()
 
     def score(self, board: Block) -> int:
         """Return the current score for this goal on the given board.
 
+        The score is always greater than or equal to 0.
+
+        Scores are cached by board_hash, so scoring a board with the same
+        unit cells as a recently scored one does not compute it again.
+        """
+        key = board.board_hash()
+        if key in self._score_cache:
+            self._score_cache.move_to_end(key)
+            return self._score_cache[key]
+
+        result = self._compute_score(board)
+        self._score_cache[key] = result
+        if len(self._score_cache) > self.SCORE_CACHE_SIZE:
+            self._score_cache.popitem(last=False)
+        return result
+
+    def _compute_score(self, board: Block) -> int:
+        """Return the current score for this goal on the given board,
+        without looking in the cache.
+
+        Each child class computes its score here.
+        """
+        raise NotImplementedError
+
+    def score_delta(self, board: Block, block: Block, move: int) -> int:
+        """Return how much the score for this goal on <board> would change
+        if <move> was made on <block>, which is a Block within <board>.
+
+        <move> is one of the moves of perform_move, other than a smash.  The
+        board may be changed while the delta is computed, but is restored
+        before returning.  Child classes compute the delta without scoring
+        the whole board again where they can.
+
+        Precondition: 0 <= move <= 3
+        """
+        before = self.score(board)
+        perform_move(block, move)
+        after = self.score(board)
+        undo_move(block, move)
+        return after - before
+
+    def score_grid(self, grid: numpy.ndarray) -> int:
+        """Return the current score for this goal on a board that has been
+        flattened by Block.flatten_array.
+
         The score is always greater than or equal to 0.
         """
         raise NotImplementedError
 
+    def score_grids(self, grids: numpy.ndarray) -> numpy.ndarray:
+        """Return the score for this goal on each of the flattened boards
+        stacked along the first axis of <grids>, as an array.
+
+        Child classes score all of the boards at once where they can.
+        """
+        return numpy.array([self.score_grid(grid) for grid in grids])
+
     def description(self) -> str:
         """Return a description of this goal.
         """
@@ -49,81 +115,89 @@ class BlobGoal(Goal):
     """A goal to create the largest connected blob of this goal's target
     colour, anywhere within the Block.
     """
+    # === Private Attributes ===
+    # _outside_board:
+    #     The board_hash of the board that _board_blobs and _outside_blobs
+    #     describe.
+    # _board_blobs:
+    #     The blobs of the target colour on that board, or None before
+    #     score_delta is first called.
+    # _outside_blobs:
+    #     For regions of that board, given as (x, y, width) in unit cells, the
+    #     blobs of the target colour outside of the region, as returned by
+    #     BoardBlobs.outside.
+    _outside_board: int
+    _board_blobs: Optional['BoardBlobs']
+    _outside_blobs: Dict[Tuple[int, int, int],
+                         Tuple[List[List[Tuple[int, int, int]]],
+                               List[int], int]]
 
-    def _undiscovered_blob_size(self, pos: Tuple[int, int],
-                                board: List[List[Tuple[int, int, int]]],
-                                visited: List[List[int]]) -> int:
-        """Return the size of the largest connected blob that (a) is of this
-        Goal's target colour, (b) includes the cell at <pos>, and (c) involves
-        only cells that have never been visited.
-
-        If <pos> is out of bounds for <board>, return 0.
-
-        <board> is the flattened board on which to search for the blob.
-        <visited> is a parallel structure that, in each cell, contains:
-           -1  if this cell has never been visited
-            0  if this cell has been visited and discovered
-               not to be of the target colour
-            1  if this cell has been visited and discovered
-               to be of the target colour
-
-        Update <visited> so that all cells that are visited are marked with
-        either 0 or 1.
-        """
-        size = len(board)
-        col = pos[0]
-        row = pos[1]
-
-        # first check if the position is valid.
-        if validate_position(pos, size):
-
-            # check if its the right colour
-            if board[col][row] == self.colour and visited[col][row] == -1:
-                visited[col][row] = 1
-                blob_size = 0
-                # now make recursive calls to each adjacent unit cell
-                blob_size += 1 + self._adjacent_blob_size(pos, board, visited)
-                return blob_size
-            else:
-                return 0
-
-        else:
-            return 0
-
-    def _adjacent_blob_size(self, pos, board, visited) -> int:
-        """ This is a helper method for _undiscovered_blob_size which serves
-            the purposes of recersively calling _undiscovered_blob_size on all
-            of its adjacent unit cells.
+    def __init__(self, target_colour: Tuple[int, int, int]) -> None:
+        """Initialize this goal to have the given target colour.
         """
-        col, row = pos[0], pos[1]
-        total = 0
-        total += self._undiscovered_blob_size((col - 1, row), board, visited)
-        total += self._undiscovered_blob_size((col, row - 1), board, visited)
-        total += self._undiscovered_blob_size((col + 1, row), board, visited)
-        total += self._undiscovered_blob_size((col, row + 1), board, visited)
-        return total
+        Goal.__init__(self, target_colour)
+        self._outside_board = 0
+        self._board_blobs = None
+        self._outside_blobs = {}
 
-    def score(self, board: Block) -> int:
+    def _compute_score(self, board: Block) -> int:
         """Return the current score for this goal on the given board.
         The score is always greater than or equal to 0. This score find the
         biggest undiscovered blob and returns the corresponding score.
         """
-        board = board.flatten()
-        size = len(board)
-        visited = duplicate_flatten(size)
-        score = 0
-        # check every block in every column.
-        for col in range(size):
-            for row in range(size):
-                if board[col][row] == self.colour and visited[col][row] != 1:
-                    # recursively call to adjacent cells and returns their score
-                    score = update_score(score, self._undiscovered_blob_size((
-                        col, row), board, visited))
-                # if the current location is not the colour set cell to 0.
-                elif board[col][row] != self.colour:
-                    visited[col][row] = 0
-
-        return score
+        target = colour_index(self.colour)
+        if target < 0:
+            return 0
+        return leaf_blob_sizes(board)[target]
+
+    def score_delta(self, board: Block, block: Block, move: int) -> int:
+        """Return how much the score for this goal on <board> would change
+        if <move> was made on <block>.
+
+        The undivided Blocks of the board are labelled once for each board,
+        which is O(L) for a board of L undivided Blocks, the same as scoring
+        it.  Since every move changes the board, this is done once a turn.
+        For each new block, only its own undivided Blocks, those along the
+        cells around it, and those of the blobs that reach into it are then
+        visited, to find the blobs outside of it.  These are shared by all of
+        the moves on that block.  After each move, only the undivided Blocks
+        within <block> are labelled again, and joined to the blobs outside.
+        """
+        target = colour_index(self.colour)
+        if target < 0:
+            return 0
+        before = self.score(board)
+        region = cell_region(block)
+
+        key = board.board_hash()
+        if key != self._outside_board or self._board_blobs is None:
+            self._outside_board = key
+            self._board_blobs = BoardBlobs(board, target)
+            self._outside_blobs = {}
+        if region not in self._outside_blobs:
+            self._outside_blobs[region] = self._board_blobs.outside(region)
+        outside = self._outside_blobs[region]
+
+        perform_move(block, move)
+        after = join_region(block, region[2], outside, target)
+        undo_move(block, move)
+        return after - before
+
+    def score_grid(self, grid: numpy.ndarray) -> int:
+        """Return the size of the biggest blob of this goal's colour on the
+        flattened board <grid>.
+        """
+        target = colour_index(self.colour)
+        if target < 0:
+            return 0
+        return blob_sizes(grid)[target]
+
+    def score_grids(self, grids: numpy.ndarray) -> numpy.ndarray:
+        """Return the size of the biggest blob of this goal's colour on each
+        of the flattened boards stacked in <grids>.
+        """
+        targets = numpy.full(len(grids), colour_index(self.colour))
+        return blob_scores(grids, targets)
 
     def description(self) -> str:
         """ A description of BlobGoal."""
@@ -141,87 +215,551 @@ class PerimeterGoal(Goal):
         this goal applies.
     """
 
-    def score(self, board: Block) -> int:
+    def _compute_score(self, board: Block) -> int:
         """ Returns the score, which is scored by counting all of the block
             of a colour, additionally one in the corner count for double points.
+
+            Only the Blocks touching the edge of the board are visited.
+        """
+        if board.level == board.max_depth:  # a board of a single unit cell.
+            return self.score_grid(board.flatten_array())
+        size = 2 ** (board.max_depth - board.level)
+        return perimeter_cells(board, size, (True, True, True, True),
+                               self.colour)
+
+    def score_delta(self, board: Block, block: Block, move: int) -> int:
+        """ Returns how much the score of this goal on <board> would change
+            if <move> was made on <block>.
+
+            Only the part of <block> on the edge of the board is scored,
+            before and after the move.
+        """
+        if board.level == board.max_depth:
+            return Goal.score_delta(self, board, block, move)
+        x, y, size = cell_region(block)
+        width = 2 ** (board.max_depth - board.level)
+        sides = (y == 0, y + size == width, x == 0, x + size == width)
+        if True not in sides:  # <block> is not on the edge of the board.
+            return 0
+
+        before = perimeter_cells(block, size, sides, self.colour)
+        perform_move(block, move)
+        after = perimeter_cells(block, size, sides, self.colour)
+        undo_move(block, move)
+        return after - before
+
+    def score_grid(self, grid: numpy.ndarray) -> int:
+        """ Returns the score of this goal on the flattened board <grid>, by
+            counting the cells of this goal's colour on the outer ring of the
+            board, plus one for each corner of that colour.
+        """
+        target = colour_index(self.colour)
+        if target < 0:
+            return 0
+        matches = grid == target
+        if len(matches) == 1:  # the only cell is on every side of the board.
+            ring = int(matches[0, 0])
+        else:
+            ring = int(matches[0, :].sum() + matches[-1, :].sum() +
+                       matches[1:-1, 0].sum() + matches[1:-1, -1].sum())
+        corners = int(matches[0, 0]) + int(matches[0, -1]) + \
+            int(matches[-1, 0]) + int(matches[-1, -1])
+        return ring + corners
+
+    def score_grids(self, grids: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the score of this goal on each of the flattened boards
+            stacked in <grids>, the same as score_grid.
         """
-        score = 0
-        board = board.flatten()
-        size = len(board)
-        for col in range(size):
-            if col == 0 or col == size - 1:  # check the entire row.
-                score += self._check_row(col, board)
-            else:  # only check the perimeter if not the top or bottom row.
-                if board[col][0] == self.colour:
-                    score += 1
-                if board[col][size - 1] == self.colour:
-                    score += 1
-        return score + self.corner_score(size, board)
-
-    def corner_score(self, size: int,
-                     board: List[List[Tuple[int, int, int]]]) -> int:
-        """
-        This a helper method for perimeter goal that checks all of the corners
-        as they account for double points.
-        """
-        score = 0
-        bound = size - 1
-        corners = [(0, 0), (0, bound), (bound, 0), (bound, bound)]
-        for corner in corners:
-            if board[corner[0]][corner[1]] == self.colour:
-                score += 1
-        return score
-
-    def _check_row(self, col, board) -> int:
-        """
-        This is a helper method for the score method of perimeter goal, which
-        checks the row to count how many block are touching the perimeter.
-        """
-        score = 0
-        for row in range(len(board)):
-            if board[col][row] == self.colour:
-                score += 1
-        return score
+        targets = numpy.full(len(grids), colour_index(self.colour))
+        return perimeter_scores(grids, targets)
 
     def description(self) -> str:
         """ Gives a description of the Perimeter Goal."""
         return "put units of a given colour on the perimeter of the board."
 
 
-def duplicate_flatten(size: int) -> List[List[int]]:
+def blob_sizes(grid: numpy.ndarray) -> List[int]:
     """
-    This is a helper method of the score method of the BlobGoal, it creates
-    a flatten representation on the board of the same <size>, but with -1 as the
-    value for each cell.
+    This is a helper function for the score_grid method of the BlobGoal. It
+    returns a list with the size of the biggest blob of each colour of
+    COLOUR_LIST on the flattened board <grid>, in one pass over the board.
+
+    Unit cells are labelled with a union-find structure while scanning the
+    board, by joining every cell to its neighbours above and to the left of
+    it that have the same colour.  No recursion is involved, so any size of
+    board can be scored.
     """
-    duplicate = []
-    for _ in range(size):
-        temp = [-1] * size
-        duplicate.append(temp)
-    return duplicate
+    cells = grid.ravel().tolist()  # cell (col, row) is at col * size + row
+    labels = label_cells(cells, len(grid))
 
+    blob_size = [0] * len(cells)
+    for label in labels:
+        blob_size[label] += 1
 
-def validate_position(position: Tuple[int, int], bound: int) -> bool:
+    best = [0] * len(COLOUR_LIST)
+    for cell in range(len(cells)):
+        if blob_size[cell] > best[cells[cell]]:
+            best[cells[cell]] = blob_size[cell]
+    return best
+
+
+def blob_scores(grids: numpy.ndarray, targets: numpy.ndarray) \
+        -> numpy.ndarray:
+    """
+    Return the size of the biggest blob of the colour index targets[i] on the
+    flattened board grids[i], for each of the boards stacked in <grids>.
+
+    All the boards are labelled together with numpy, as one union-find
+    structure over every cell of the target colour.  In each round, the root
+    of every pair of neighbouring cells is pointed at the smaller of their two
+    roots, then every cell is pointed straight at its root.  It takes only a
+    few rounds, whatever the number of boards.
+    """
+    count, size = grids.shape[0], grids.shape[1]
+    cells = size * size
+    in_target = grids == numpy.asarray(targets).reshape(count, 1, 1)
+    index = numpy.arange(count * cells).reshape(count, size, size)
+    # Pairs of neighbouring cells of the target colour, in columns and rows.
+    in_col = in_target[:, :, 1:] & in_target[:, :, :-1]
+    in_row = in_target[:, 1:, :] & in_target[:, :-1, :]
+    first = numpy.concatenate([index[:, :, 1:][in_col],
+                               index[:, 1:, :][in_row]])
+    second = numpy.concatenate([index[:, :, :-1][in_col],
+                                index[:, :-1, :][in_row]])
+
+    parent = numpy.arange(count * cells)
+    while True:
+        first_root = parent[first]
+        second_root = parent[second]
+        apart = first_root != second_root
+        if not apart.any():
+            break
+        first_root = first_root[apart]
+        second_root = second_root[apart]
+        numpy.minimum.at(parent, numpy.maximum(first_root, second_root),
+                         numpy.minimum(first_root, second_root))
+        while True:
+            jumped = parent[parent]
+            if numpy.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    sizes = numpy.bincount(parent[in_target.ravel()],
+                           minlength=count * cells)
+    return sizes.reshape(count, cells).max(axis=1)
+
+
+def perimeter_scores(grids: numpy.ndarray, targets: numpy.ndarray) \
+        -> numpy.ndarray:
     """
-    This is a helper function function for the score method of the BlobGoal, it
-    returns whether or not the given <position> is a valid coordinate.
+    Return the PerimeterGoal score of the colour index targets[i] on the
+    flattened board grids[i], for each of the boards stacked in <grids>.
     """
-    if position[0] < 0 or position[0] >= bound:
-        return False
-    if position[1] < 0 or position[1] >= bound:
-        return False
-    return True
+    matches = grids == numpy.asarray(targets).reshape(len(grids), 1, 1)
+    if matches.shape[1] == 1:  # the only cell is on every side of the board.
+        ring = matches[:, 0, 0].astype(int)
+    else:
+        ring = matches[:, 0, :].sum(axis=1) + matches[:, -1, :].sum(axis=1) + \
+            matches[:, 1:-1, 0].sum(axis=1) + matches[:, 1:-1, -1].sum(axis=1)
+    corners = matches[:, 0, 0].astype(int) + matches[:, 0, -1] + \
+        matches[:, -1, 0] + matches[:, -1, -1]
+    return ring + corners
 
 
-def update_score(best_score: int, new_score: int) -> int:
+def label_cells(cells: List[int], size: int) -> List[int]:
     """
-    This is a helper method which returns the updates version of the score,
-    depending whether the <new_score> is greater than the current <best_score>
+    This is a helper function for blob_sizes. <cells> is a flattened board
+    of <size> by <size> unit cells, with cell (col, row) at col * size + row.
+    Return a list with the label of the blob containing each cell, which is
+    the position of one cell of that blob.
+
+    Unit cells are labelled with a union-find structure while scanning the
+    board, by joining every cell to its neighbours above and to the left of
+    it that have the same value.
     """
-    if new_score > best_score:
-        return new_score
-    else:
-        return best_score
+    parent = list(range(len(cells)))
+
+    for cell in range(len(cells)):
+        colour = cells[cell]
+        for neighbour in [cell - 1, cell - size]:
+            if neighbour < 0 or cells[neighbour] != colour or \
+                    (neighbour == cell - 1 and cell % size == 0):
+                continue
+            # Join the blobs of <cell> and <neighbour>, halving the paths
+            # to their roots on the way.
+            root = find_root(parent, cell)
+            other = find_root(parent, neighbour)
+            if root != other:
+                parent[root] = other
+
+    return [find_root(parent, cell) for cell in range(len(cells))]
+
+
+class BoardBlobs:
+    """The blobs of one colour on a board, labelled once from its undivided
+    Blocks, from which the blobs outside of any block of the board are found
+    without labelling the whole board again.
+
+    === Public Attributes ===
+    target:
+        The index in COLOUR_LIST of the colour of the blobs.
+    """
+    target: int
+    # === Private Attributes ===
+    # _width:
+    #     The width of the board in unit cells.
+    # _root:
+    #     The label of the blob of each undivided Block, by its label from
+    #     label_leaves.  Undivided Blocks are labelled in pre-order, so those
+    #     within any block have consecutive labels.
+    # _area:
+    #     The number of unit cells of each undivided Block.
+    # _colour:
+    #     The index in COLOUR_LIST of the colour of each undivided Block.
+    # _squares:
+    #     The (x, y, size) in unit cells of each undivided Block.
+    # _leaf_at:
+    #     The label of the undivided Block of each of those squares.
+    # _blob_leaves:
+    #     The undivided Blocks of each blob of the target colour, by blob.
+    # _sizes:
+    #     The number of unit cells of each blob of the target colour.
+    # _order:
+    #     The blobs of the target colour, biggest first.
+    _width: int
+    _root: List[int]
+    _area: List[int]
+    _colour: List[int]
+    _squares: List[Tuple[int, int, int]]
+    _leaf_at: Dict[Tuple[int, int, int], int]
+    _blob_leaves: Dict[int, List[int]]
+    _sizes: Dict[int, int]
+    _order: List[int]
+
+    def __init__(self, board: Block, target: int) -> None:
+        """Label the blobs of the colour at index <target> in COLOUR_LIST on
+        <board>, the root of a board.
+        """
+        parent = []
+        self.target = target
+        self._width = 2 ** (board.max_depth - board.level)
+        self._area = []
+        self._colour = []
+        self._squares = []
+        label_leaves(board, (0, 0), self._width,
+                     [parent, self._area, self._colour], self._squares)
+        self._root = [find_root(parent, leaf) for leaf in range(len(parent))]
+        self._leaf_at = {self._squares[leaf]: leaf
+                         for leaf in range(len(self._squares))}
+
+        self._blob_leaves = {}
+        self._sizes = {}
+        for leaf in range(len(parent)):
+            if self._colour[leaf] == target:
+                blob = self._root[leaf]
+                self._blob_leaves.setdefault(blob, []).append(leaf)
+                self._sizes[blob] = self._sizes.get(blob, 0) + \
+                    self._area[leaf]
+        self._order = sorted(self._sizes, key=self._sizes.get, reverse=True)
+
+    def leaf(self, x: int, y: int) -> int:
+        """Return the label of the undivided Block containing unit cell
+        (x, y), in O(max_depth) time.
+        """
+        size = self._width
+        while (x - x % size, y - y % size, size) not in self._leaf_at:
+            size //= 2
+        return self._leaf_at[(x - x % size, y - y % size, size)]
+
+    def line(self, x: int, y: int, length: int,
+             across: bool) -> List[Tuple[int, int, int]]:
+        """Return the undivided Blocks along the <length> unit cells starting
+        at (x, y), going right if <across> is True and down otherwise, as
+        (label, start, end) relative to the first cell, in order.
+
+        Return an empty list if the cells are not on the board.
+        """
+        if not (0 <= x < self._width and 0 <= y < self._width):
+            return []
+        segments = []
+        start = 0
+        while start < length:
+            if across:
+                leaf = self.leaf(x + start, y)
+                end = self._squares[leaf][0] + self._squares[leaf][2] - x
+            else:
+                leaf = self.leaf(x, y + start)
+                end = self._squares[leaf][1] + self._squares[leaf][2] - y
+            end = min(end, length)
+            segments.append((leaf, start, end))
+            start = end
+        return segments
+
+    def outside(self, region: Tuple[int, int, int]) \
+            -> Tuple[List[List[Tuple[int, int, int]]], List[int], int]:
+        """Return the blobs of the board as if the square <region>, given as
+        (x, y, width) in unit cells, was not part of it.  <region> is the
+        square of a block of the board.
+
+        Return the labels of the cells along the top, bottom, left and right
+        sides of the region, just outside of it, in the form returned by
+        label_leaves but relative to the corner of the region.  Only the
+        blobs of the target colour have a label of their own, and all other
+        cells share the last label.  Also return the size of the blob of each
+        label, and the size of the biggest blob of the target colour.
+
+        Only the undivided Blocks within the region, along the cells around
+        it, and of the blobs that reach into it are visited.
+        """
+        x, y, width = region
+        # The first and last undivided Blocks within the region in
+        # pre-order are at its upper right and lower right corners.
+        first = self.leaf(x + width - 1, y)
+        last = self.leaf(x + width - 1, y + width - 1)
+        split = {self._root[leaf] for leaf in range(first, last + 1)
+                 if self._colour[leaf] == self.target}
+
+        # A blob that reaches into the region may fall apart without it, so
+        # the rest of each one is joined again, into pieces.
+        pieces = {}
+        for blob in split:
+            for leaf in self._blob_leaves[blob]:
+                if not first <= leaf <= last:
+                    pieces[leaf] = leaf
+        for leaf in pieces:
+            leaf_x, leaf_y, size = self._squares[leaf]
+            for other, _, _ in self.line(leaf_x + size, leaf_y, size,
+                                         False) + \
+                    self.line(leaf_x, leaf_y + size, size, True):
+                if other in pieces:
+                    root = find_root(pieces, leaf)
+                    other_root = find_root(pieces, other)
+                    if root != other_root:
+                        pieces[root] = other_root
+        sizes = {}
+        for leaf in pieces:
+            # Pieces are labelled after every blob of the whole board.
+            piece = find_root(pieces, leaf) + len(self._root)
+            sizes[piece] = sizes.get(piece, 0) + self._area[leaf]
+        best = max(sizes.values(), default=0)
+        for blob in self._order:
+            if blob not in split:
+                best = max(best, self._sizes[blob])
+                break
+        for blob in self._sizes:
+            if blob not in split:
+                sizes[blob] = self._sizes[blob]
+
+        sides = [self.line(x, y - 1, width, True),
+                 self.line(x, y + width, width, True),
+                 self.line(x - 1, y, width, False),
+                 self.line(x + width, y, width, False)]
+        touching = {}
+        labelled = []
+        for side in sides:
+            labelled.append([])
+            for leaf, start, end in side:
+                label = None
+                if self._colour[leaf] == self.target:
+                    label = self._root[leaf]
+                    if label in split:
+                        label = find_root(pieces, leaf) + len(self._root)
+                    if label not in touching:
+                        touching[label] = len(touching)
+                    label = touching[label]
+                labelled[-1].append((label, start, end))
+
+        # The cells of other colours, and those off the board, all get the
+        # last label.
+        other = len(touching)
+        for side in labelled:
+            if len(side) == 0:
+                side.append((None, 0, width))
+            for i in range(len(side)):
+                if side[i][0] is None:
+                    side[i] = (other, side[i][1], side[i][2])
+        blob_sizes = [0] * (other + 1)
+        for label in touching:
+            blob_sizes[touching[label]] = sizes[label]
+        return labelled, blob_sizes, best
+
+
+def join_region(block: Block, width: int,
+                outside: Tuple[List[List[Tuple[int, int, int]]],
+                               List[int], int],
+                target: int) -> int:
+    """
+    This is a helper function for the score_delta method of the BlobGoal. It
+    returns the size of the biggest blob of the colour at index <target> in
+    COLOUR_LIST on a board made of <block>, which is <width> unit cells wide,
+    and of the rest of the board as labelled in <outside> by outside_blobs.
+
+    Only the undivided Blocks within <block> are visited.
+    """
+    sides, sizes, best = outside
+    # The blobs outside keep their labels, and the undivided Blocks inside
+    # are labelled after them.  Blobs touching across the sides are joined.
+    parent = list(range(len(sizes)))
+    area = list(sizes)
+    colour = [target] * (len(sizes) - 1) + [len(COLOUR_LIST)]
+    leaves = [parent, area, colour]
+    inside = label_leaves(block, (0, 0), width, leaves)
+    for i in range(4):
+        join_sides(inside[i], sides[i], leaves)
+
+    total = [0] * len(parent)
+    for label in range(len(parent)):
+        if colour[label] == target:
+            total[find_root(parent, label)] += area[label]
+    return max(best, max(total))
+
+
+def leaf_blob_sizes(board: Block) -> List[int]:
+    """
+    This is a helper function for the score method of the BlobGoal. It
+    returns a list with the size of the biggest blob of each colour of
+    COLOUR_LIST on <board>, like blob_sizes, but without flattening it.
+
+    Every undivided Block is labelled as a whole, weighted by the number of
+    unit cells it covers, and joined to the neighbouring undivided Blocks of
+    the same colour.  The cost depends on the number of undivided Blocks
+    rather than on the number of unit cells.
+    """
+    parent = []
+    area = []
+    colour = []
+    size = 2 ** (board.max_depth - board.level)
+    label_leaves(board, (0, 0), size, [parent, area, colour])
+
+    best = [0] * len(COLOUR_LIST)
+    total = [0] * len(parent)
+    for leaf in range(len(parent)):
+        total[find_root(parent, leaf)] += area[leaf]
+    for leaf in range(len(parent)):
+        if total[leaf] > best[colour[leaf]]:
+            best[colour[leaf]] = total[leaf]
+    return best
+
+
+def label_leaves(block: Block, position: Tuple[int, int], size: int,
+                 leaves: List[List[int]],
+                 squares: Optional[List[Tuple[int, int, int]]] = None) \
+        -> List[List[Tuple[int, int, int]]]:
+    """
+    This is a helper function for leaf_blob_sizes. It labels every undivided
+    Block within <block>, which has its upper left corner at unit cell
+    <position> and is <size> unit cells wide, and joins the labels of
+    neighbouring undivided Blocks of the same colour.
+
+    <leaves> holds the union-find parent, the area and the colour index of
+    every label so far, and is extended with the new labels.  If <squares>
+    is given, the (x, y, size) of every new label is appended to it.
+
+    Return the labels along the top, bottom, left and right sides of <block>,
+    each as a list of (label, start, end) in increasing order of position
+    along that side.
+    """
+    parent, area, colour = leaves
+    x, y = position
+    children = block.children
+    if len(children) == 0:
+        label = len(parent)
+        parent.append(label)
+        area.append(size * size)
+        colour.append(colour_index(block.colour))
+        if squares is not None:
+            squares.append((x, y, size))
+        return [[(label, x, x + size)], [(label, x, x + size)],
+                [(label, y, y + size)], [(label, y, y + size)]]
+
+    half = size // 2
+    upper_right = label_leaves(children[0], (x + half, y), half, leaves,
+                               squares)
+    upper_left = label_leaves(children[1], (x, y), half, leaves, squares)
+    lower_left = label_leaves(children[2], (x, y + half), half, leaves,
+                              squares)
+    lower_right = label_leaves(children[3], (x + half, y + half), half,
+                               leaves, squares)
+
+    # Join the labels on each side of the two seams between the children.
+    join_sides(upper_left[3], upper_right[2], leaves)
+    join_sides(lower_left[3], lower_right[2], leaves)
+    join_sides(upper_left[1], lower_left[0], leaves)
+    join_sides(upper_right[1], lower_right[0], leaves)
+
+    return [upper_left[0] + upper_right[0], lower_left[1] + lower_right[1],
+            upper_left[2] + lower_left[2], upper_right[3] + lower_right[3]]
+
+
+def join_sides(first: List[Tuple[int, int, int]],
+               second: List[Tuple[int, int, int]],
+               leaves: List[List[int]]) -> None:
+    """
+    This is a helper function for label_leaves. <first> and <second> are the
+    labels along the two sides of the same seam, as returned by label_leaves.
+    Join every pair of labels of the same colour which touch along the seam.
+    """
+    parent, _, colour = leaves
+    i = 0
+    j = 0
+    while i < len(first) and j < len(second):
+        label, _, end = first[i]
+        other, _, other_end = second[j]
+        if colour[label] == colour[other]:
+            root = find_root(parent, label)
+            other_root = find_root(parent, other)
+            if root != other_root:
+                parent[root] = other_root
+        # Move past whichever of the two ends first along the seam.
+        if end <= other_end:
+            i += 1
+        if other_end <= end:
+            j += 1
+
+
+def perimeter_cells(block: Block, size: int,
+                    sides: Tuple[bool, bool, bool, bool],
+                    colour: Tuple[int, int, int]) -> int:
+    """
+    This is a helper function for the score method of the PerimeterGoal. It
+    returns the score of the unit cells of <colour> within <block> which lie
+    on the edge of the board.
+
+    <block> is <size> unit cells wide, and touches the top, bottom, left and
+    right edges of the board as given by <sides>.  An undivided Block scores
+    its length along each edge it touches, so a corner cell, which touches
+    two edges, counts double.
+
+    Precondition: the board is at least two unit cells wide.
+    """
+    children = block.children
+    if len(children) == 0:
+        if block.colour != colour:
+            return 0
+        return size * sides.count(True)
+
+    top, bottom, left, right = sides
+    half = size // 2
+    score = 0
+    for child, child_sides in [(children[0], (top, False, False, right)),
+                               (children[1], (top, False, left, False)),
+                               (children[2], (False, bottom, left, False)),
+                               (children[3], (False, bottom, False, right))]:
+        if True in child_sides:  # only visit children on the edge.
+            score += perimeter_cells(child, half, child_sides, colour)
+    return score
+
+
+def find_root(parent: Union[List[int], Dict[int, int]], cell: int) -> int:
+    """
+    This is a helper function for labelling blobs, which returns the root of
+    the tree containing <cell> in the union-find structure <parent>, and
+    halves the length of the path to it.
+    """
+    while parent[cell] != cell:
+        parent[cell] = parent[parent[cell]]
+        cell = parent[cell]
+    return cell
 
 
 if __name__ == '__main__':
@@ -229,7 +767,8 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing',
-            'block', 'goal', 'player', 'renderer'
+            'block', 'goal', 'player', 'renderer', 'numpy',
+            'collections'
         ],
         'max-attributes': 15
     })
@@ -0,0 +1,141 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains functions to list every move that can be made on a
+Blocky board, and to sample from them.
+
+A move is stored as a single int.  Its lowest three bits are the option of
+perform_move, and the bits above them encode the path from the root of the
+board to the block the move is made on: a leading 1, followed by two bits for
+the index of the child taken at each level.
+"""
+import random
+from typing import List, Tuple
+from block import Block, combine_hashes, perform_move, follow_path
+
+# The number of bits of a move which hold its option.
+OPTION_BITS = 3
+
+
+def encode_move(path: List[int], option: int) -> int:
+    """Return the int for the move <option>, as in perform_move, made on the
+    block reached by following <path> from the root of the board.
+
+    >>> decode_move(encode_move([3, 0, 2], 1))
+    ([3, 0, 2], 1)
+    """
+    code = 1
+    for index in path:
+        code = (code << 2) | index
+    return (code << OPTION_BITS) | option
+
+
+def decode_move(move: int) -> Tuple[List[int], int]:
+    """Return the path to the block and the option of the int <move>, as
+    returned by encode_move.
+    """
+    option = move & ((1 << OPTION_BITS) - 1)
+    code = move >> OPTION_BITS
+    path = []
+    while code > 1:
+        path.append(code & 3)
+        code >>= 2
+    path.reverse()
+    return path, option
+
+
+def make_move(board: Block, move: int) -> Block:
+    """Make the int <move> on <board>, and return the block it was made on.
+    """
+    path, option = decode_move(move)
+    block = follow_path(board, path)
+    perform_move(block, option)
+    return block
+
+
+def legal_moves(board: Block, smash: bool = False) -> List[int]:
+    """Return every move on <board> that changes it, each one once, as ints.
+
+    No move is made on a block without children, and of the swaps and
+    rotations of a block that leave it the same as each other, or unchanged,
+    only the first is kept.  For example, a block whose four children are
+    identical has no moves at all, and a block that looks the same after a
+    half turn is only rotated clockwise.
+
+    If <smash> is True, smashing each block that can be smashed is also
+    included.  A smash can never be told apart from another move in advance,
+    so they are never left out.
+    """
+    moves = []
+    stack = [(board, 1)]
+    while len(stack) > 0:
+        block, code = stack.pop()
+        children = block.children
+        if smash and 0 < block.level < block.max_depth:
+            moves.append((code << OPTION_BITS) | 4)
+        if len(children) > 0:
+            for option in distinct_options(block, children):
+                moves.append((code << OPTION_BITS) | option)
+            for index in range(4):
+                stack.append((children[index], (code << 2) | index))
+    return moves
+
+
+def distinct_options(block: Block, children: List[Block]) -> List[int]:
+    """
+    This is a helper function for legal_moves, which returns the swaps and
+    rotations of <block> that change it and give different blocks, in the
+    order of perform_move.  <children> are the children of <block>.
+
+    The block each option would give is compared by its board_hash, so no
+    option is tried.
+    """
+    hashes = [child.board_hash() for child in children]
+    results = [combine_hashes([hashes[1], hashes[0], hashes[3], hashes[2]]),
+               combine_hashes([hashes[3], hashes[2], hashes[1], hashes[0]]),
+               block.rotated_hash(1),
+               block.rotated_hash(3)]
+    seen = {block.board_hash()}
+    options = []
+    for option in range(4):
+        if results[option] not in seen:
+            seen.add(results[option])
+            options.append(option)
+    return options
+
+
+def sample_moves(moves: List[int], count: int) -> List[int]:
+    """Return <count> different moves chosen uniformly at random from
+    <moves>, or all of them in a random order if there are fewer than
+    <count>.
+    """
+    return random.sample(moves, min(count, len(moves)))
+
+
+def best_first(moves: List[int]) -> List[int]:
+    """Return <moves> in a random order, except that moves on bigger blocks,
+    which change more of the board, come before moves on smaller ones.
+    """
+    ordered = list(moves)
+    random.shuffle(ordered)
+    # Moves on deeper blocks have longer paths, and so more bits.
+    ordered.sort(key=lambda move: move.bit_length())
+    return ordered
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', 'block'
+        ],
+    })
+    import doctest
+    doctest.testmod()
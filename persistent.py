@@ -0,0 +1,353 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains the PersistentBlock class, an immutable alternative to
+the Block class.  Making a move on a PersistentBlock board returns a new board
+and leaves the old one as it was, so any number of boards reached by
+different moves can be kept and searched at once, or shared between threads.
+"""
+from typing import Callable, List, Optional, Tuple
+import math
+import random
+import numpy
+from renderer import COLOUR_LIST, colour_index
+from block import Block, combine_hashes, solid_hash, rotate_array, \
+    fill_quadrant
+from moves import decode_move
+
+
+class PersistentBlock:
+    """A square block in a Blocky board that never changes.
+
+    A move returns a new root, which shares every block that the move does
+    not change with the old board, so it only creates O(max_depth) new
+    blocks.  For the same reason, a PersistentBlock has no parent, position
+    or size: the same block may be part of many boards.  Blocks are reached
+    by their path of child indexes from the root instead, as in the moves
+    module.
+
+    A PersistentBlock has the attributes and methods of a Block that the
+    goals use to score a board, so Goal.score works on it directly.
+
+    === Public Attributes ===
+    level:
+        The level of this block within the overall block structure.
+    max_depth:
+        The deepest level allowed in the overall block structure.
+    colour:
+        If this block is not subdivided, <colour> stores its colour.
+        Otherwise, <colour> is None.
+
+    === Representation Invariants ===
+    - len(_children) == 0 or len(_children) == 4
+    - If this block has children, they have the same max_depth and a level
+      one greater than this block, and this block's colour is None
+    - If this block has no children, its colour is not None and _rotation == 0
+    - 0 <= _rotation <= 3
+    """
+    level: int
+    max_depth: int
+    colour: Optional[Tuple[int, int, int]]
+    # === Private Attributes ===
+    # _children:
+    #     The children of this block as they are stored, before its pending
+    #     rotation is applied, in the same order as Block.children.
+    # _rotation:
+    #     The number of clockwise quarter turns of this block which have not
+    #     been applied to _children.  Rotating a block only creates a new
+    #     block with a different _rotation, sharing the same _children.
+    # _resolved:
+    #     The public children of this block, with the rotation applied, or
+    #     None if they have not been read yet.
+    # _hashes:
+    #     The board_hash of the stored children after 0, 1, 2 and 3 clockwise
+    #     quarter turns, or None if they have not been computed yet.
+    # _flattened_array:
+    #     The flattened form of the stored children, or None if it has not
+    #     been computed yet.
+    #
+    # The last three are only caches: since a PersistentBlock never changes,
+    # they are never invalidated.
+    _children: Tuple['PersistentBlock', ...]
+    _rotation: int
+    _resolved: Optional[List['PersistentBlock']]
+    _hashes: Optional[Tuple[int, int, int, int]]
+    _flattened_array: Optional[numpy.ndarray]
+
+    def __init__(self, level: int, max_depth: int,
+                 colour: Optional[Tuple[int, int, int]] = None,
+                 children: Tuple['PersistentBlock', ...] = (),
+                 rotation: int = 0) -> None:
+        """Initialize this PersistentBlock with the given <level>,
+        <max_depth>, and either a <colour> or four stored <children> turned
+        by <rotation> clockwise quarter turns.
+        """
+        self.level = level
+        self.max_depth = max_depth
+        self.colour = colour
+        self._children = children
+        self._rotation = rotation
+        self._resolved = None
+        self._hashes = None
+        self._flattened_array = None
+
+    @property
+    def children(self) -> List['PersistentBlock']:
+        """The children of this block, in the same order as Block.children,
+        with its pending rotation applied.
+        """
+        if self._resolved is None:
+            turns = self._rotation
+            old = self._children
+            self._resolved = [old[(i + turns) % 4].rotated(turns)
+                              for i in range(len(old))]
+        return self._resolved
+
+    def rotated(self, turns: int) -> 'PersistentBlock':
+        """Return this block after <turns> clockwise quarter turns.
+        """
+        if len(self._children) == 0 or turns % 4 == 0:
+            return self
+        return PersistentBlock(self.level, self.max_depth, None,
+                               self._children, (self._rotation + turns) % 4)
+
+    def swap(self, direction: int, path: Tuple[int, ...] = ()) \
+            -> 'PersistentBlock':
+        """Return the board with this block as its root, after the children
+        of the block at <path> from it are swapped.
+
+        If <direction> is 1, swap vertically.  If <direction> is 0, swap
+        horizontally. If the block has no children, return this block.
+        """
+        def swap_block(block: PersistentBlock) -> PersistentBlock:
+            old = block.children
+            if len(old) == 0:
+                return block
+            elif direction == 1:  # vertical swap
+                new_children = (old[3], old[2], old[1], old[0])
+            else:  # horizontal swap
+                new_children = (old[1], old[0], old[3], old[2])
+            return PersistentBlock(block.level, block.max_depth, None,
+                                   new_children)
+
+        return self.replace(path, swap_block)
+
+    def rotate(self, direction: int, path: Tuple[int, ...] = ()) \
+            -> 'PersistentBlock':
+        """Return the board with this block as its root, after the block at
+        <path> from it is rotated.
+
+        If <direction> is 1, rotate clockwise.  If <direction> is 3, rotate
+        counterclockwise.  Only one block on the path is created for the
+        rotation itself, however big the rotated block is.
+        """
+        return self.replace(path, lambda block: block.rotated(direction))
+
+    def smash(self, path: Tuple[int, ...] = ()) -> 'PersistentBlock':
+        """Return the board with this block as its root, after the block at
+        <path> from it is smashed.
+
+        If the block can be smashed, it gets four new randomly generated
+        children, drawn from the random module as Block.smash does.  A block
+        can be smashed iff it is not the root and it is not already at the
+        level of the maximum depth.  Otherwise, return this block.
+        """
+        def smash_block(block: PersistentBlock) -> PersistentBlock:
+            if block.level == 0 or block.level == block.max_depth:
+                return block
+            level = block.level + 1
+            new_upper_left = random_persistent(level, block.max_depth)
+            new_upper_right = random_persistent(level, block.max_depth)
+            new_low_right = random_persistent(level, block.max_depth)
+            new_low_left = random_persistent(level, block.max_depth)
+            return PersistentBlock(block.level, block.max_depth, None,
+                                   (new_upper_right, new_upper_left,
+                                    new_low_left, new_low_right))
+
+        return self.replace(path, smash_block)
+
+    def move(self, option: int, path: Tuple[int, ...] = ()) \
+            -> 'PersistentBlock':
+        """Return the board with this block as its root, after the move
+        <option>, as in block.perform_move, is made on the block at <path>.
+
+        Precondition: 0 <= option <= 4
+        """
+        if option == 0:
+            return self.swap(0, path)
+        elif option == 1:
+            return self.swap(1, path)
+        elif option == 2:
+            return self.rotate(1, path)
+        elif option == 3:
+            return self.rotate(3, path)
+        return self.smash(path)
+
+    def replace(self, path: Tuple[int, ...],
+                change: Callable[['PersistentBlock'], 'PersistentBlock']) \
+            -> 'PersistentBlock':
+        """Return the board with this block as its root, with the block at
+        <path> from it replaced by <change> of that block.
+
+        Only the blocks on <path> are created again, and every other block is
+        shared with this board.  If <change> returns the block it was given,
+        return this block.
+        """
+        if len(path) == 0:
+            return change(self)
+        children = self.children
+        index = path[0]
+        new_child = children[index].replace(path[1:], change)
+        if new_child is children[index]:
+            return self
+        new_children = list(children)
+        new_children[index] = new_child
+        return PersistentBlock(self.level, self.max_depth, None,
+                               tuple(new_children))
+
+    def board_hash(self) -> int:
+        """Return a 64-bit hash of the unit cells of this block, equal to the
+        Block.board_hash of a Block with the same unit cells.
+        """
+        return self._stored_hashes()[self._rotation]
+
+    def rotated_hash(self, turns: int) -> int:
+        """Return the board_hash this block would have after <turns>
+        clockwise quarter turns.
+        """
+        return self._stored_hashes()[(self._rotation + turns) % 4]
+
+    def _stored_hashes(self) -> Tuple[int, int, int, int]:
+        """Return the hash of the stored children of this block after 0, 1,
+        2 and 3 clockwise quarter turns, as Block._stored_hashes does.
+        """
+        if self._hashes is None:
+            if len(self._children) == 0:
+                solid = solid_hash(colour_index(self.colour),
+                                   self.max_depth - self.level)
+                self._hashes = (solid, solid, solid, solid)
+            else:
+                hashes = []
+                for turns in range(4):
+                    rotated = []
+                    for i in range(4):
+                        child = self._children[(i + turns) % 4]
+                        rotated.append(child._stored_hashes()[
+                            (child._rotation + turns) % 4])
+                    hashes.append(combine_hashes(rotated))
+                self._hashes = tuple(hashes)
+        return self._hashes
+
+    def flatten_array(self) -> numpy.ndarray:
+        """Return a read-only two-dimensional numpy array of the colour
+        indexes of the unit cells of this block, indexed the same way as
+        Block.flatten_array.
+        """
+        return self._oriented_array()
+
+    def _oriented_array(self) -> numpy.ndarray:
+        """Return the flattened form of this block, as block.fill_quadrant
+        reads it from a child.  A PersistentBlock has no parent, so this is
+        the same as flatten_array.
+        """
+        if self._flattened_array is None:
+            size = 2 ** (self.max_depth - self.level)
+            if len(self._children) == 0:
+                sol = numpy.full((size, size), colour_index(self.colour),
+                                 dtype=numpy.uint8)
+            else:
+                sol = numpy.empty((size, size), dtype=numpy.uint8)
+                half = size // 2
+                fill_quadrant(sol[half:, :half], self._children[0])
+                fill_quadrant(sol[:half, :half], self._children[1])
+                fill_quadrant(sol[:half, half:], self._children[2])
+                fill_quadrant(sol[half:, half:], self._children[3])
+            sol.flags.writeable = False
+            self._flattened_array = sol
+        if self._rotation != 0:
+            return rotate_array(self._flattened_array, self._rotation)
+        return self._flattened_array
+
+    def flatten(self) -> List[List[Tuple[int, int, int]]]:
+        """Return the unit cells of this block as a two-dimensional list of
+        colours, the same as Block.flatten.
+        """
+        return [[COLOUR_LIST[cell] for cell in column]
+                for column in self.flatten_array().tolist()]
+
+    def to_block(self) -> Block:
+        """Return a new Block board with the same unit cells as this block,
+        with this block's level as the level of its root.
+
+        The Block has no position or size yet.  They can be set with
+        update_block_locations.
+        """
+        if len(self._children) == 0:
+            block = Block(self.level, self.colour)
+        else:
+            block = Block(self.level,
+                          children=[child.to_block()
+                                    for child in self.children])
+        block.max_depth = self.max_depth
+        return block
+
+
+def random_persistent(level: int, max_depth: int) -> PersistentBlock:
+    """Return a randomly-generated PersistentBlock with level <level> and
+    subdivided to a maximum depth of <max_depth>.
+
+    The random numbers are drawn in the same order as block.random_init, so
+    the same seed gives the same board.
+
+    Precondition:
+        level <= max_depth
+    """
+    subdivide_constant = math.exp(-0.25 * level)
+    rand = random.random()
+
+    if rand >= subdivide_constant or level == max_depth:
+        return PersistentBlock(level, max_depth,
+                               COLOUR_LIST[random.randint(0, 3)])
+    upper_right_block = random_persistent(level + 1, max_depth)
+    upper_left_block = random_persistent(level + 1, max_depth)
+    lower_left_block = random_persistent(level + 1, max_depth)
+    lower_right_block = random_persistent(level + 1, max_depth)
+    return PersistentBlock(level, max_depth, None,
+                           (upper_right_block, upper_left_block,
+                            lower_left_block, lower_right_block))
+
+
+def persistent_from_block(block: Block) -> PersistentBlock:
+    """Return a PersistentBlock with the same unit cells as <block>, and the
+    same level and max_depth.
+    """
+    if len(block.children) == 0:
+        return PersistentBlock(block.level, block.max_depth, block.colour)
+    return PersistentBlock(block.level, block.max_depth, None,
+                           tuple(persistent_from_block(child)
+                                 for child in block.children))
+
+
+def apply_move(board: PersistentBlock, move: int) -> PersistentBlock:
+    """Return <board> after the int <move> from the moves module is made on
+    it, leaving <board> unchanged.
+    """
+    path, option = decode_move(move)
+    return board.move(option, tuple(path))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', 'math', 'numpy',
+            'block', 'renderer', 'moves'
+        ],
+    })
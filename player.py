@@ -11,14 +11,29 @@ University of Toronto
 This file contains the player class hierarchy.
 """
 
+import math
 import random
-from typing import Optional
+import time
+from bisect import bisect_right
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
 import pygame
 from renderer import Renderer
-from block import Block
+from block import Block, perform_move, follow_path
+from compact_block import CompactBlock, compact_from_block, \
+    block_from_compact
 from goal import Goal
+from moves import legal_moves, sample_moves, best_first, decode_move
 
 TIME_DELAY = 600
+# The most times per second that a HumanPlayer redraws the board.
+FRAME_RATE = 60
+# The longest time, in milliseconds, that a HumanPlayer sleeps waiting for an
+# event before it wakes up to wait again.
+EVENT_TIMEOUT = 500
+# The weight of each new measurement in a SmartPlayer's running estimate of
+# the time it takes to try one move.
+SCORE_TIME_WEIGHT = 0.25
 
 
 class Player:
@@ -55,6 +70,12 @@ class Player:
         """
         raise NotImplementedError
 
+    def close(self) -> None:
+        """Release anything this Player holds on to between moves, once the
+        game is over.
+        """
+        pass
+
 
 class HumanPlayer(Player):
     """A human player.
@@ -82,6 +103,16 @@ class HumanPlayer(Player):
     #     to select desired level.
     # _level:
     #     The level of the Block that the user selected
+    # _hits:
+    #     The Block that get_selected_block returned for a location in each
+    #     unit cell of the board, at each requested level, by
+    #     ((column, row), level).
+    # _hits_version:
+    #     The structure_version of the board when _hits was filled.  Once the
+    #     board changes, _hits is emptied.
+    # _cell_edges:
+    #     The x coordinates at which each column of unit cells of the board
+    #     begins on the screen, and the y coordinates at which each row does.
     #
     # == Representation Invariants concerning the private attributes ==
     #     _level >= 0
@@ -92,6 +123,9 @@ class HumanPlayer(Player):
     num_smashes: int
     _selected_block: Optional[Block]
     _level: int
+    _hits: Dict[Tuple[Tuple[int, int], int], Block]
+    _hits_version: int
+    _cell_edges: Tuple[List[float], List[float]]
 
     def __init__(self, renderer: Renderer, player_id: int, goal: Goal) -> None:
         """Initialize this HumanPlayer with the given <renderer>, <player_id>
@@ -105,6 +139,9 @@ class HumanPlayer(Player):
         # and _selected_block to None.
         self._level = 0
         self._selected_block = None
+        self._hits = {}
+        self._hits_version = -1
+        self._cell_edges = ([], [])
 
     def process_event(self, board: Block,
                       event: pygame.event.Event) -> Optional[int]:
@@ -124,12 +161,13 @@ class HumanPlayer(Player):
              allowed further smashes).
         """
         # Get the new "selected" block from the position of the cursor
-        block = board.get_selected_block(pygame.mouse.get_pos(), self._level)
+        block = self._hit_test(board, pygame.mouse.get_pos())
         # Remove the highlighting from the old "_selected_block"
         # before highlighting the new one
-        if self._selected_block is not None:
-            self._selected_block.highlighted = False
-        self._selected_block = block
+        if block != self._selected_block:
+            if self._selected_block is not None:
+                self._selected_block.highlighted = False
+            self._selected_block = block
         self._selected_block.highlighted = True
 
         # Since get_selected_block may have not returned the block at
@@ -170,6 +208,31 @@ class HumanPlayer(Player):
                     print('Tried to smash at an invalid depth!')
                     return 0
 
+    def _hit_test(self, board: Block,
+                  location: Tuple[float, float]) -> Block:
+        """Return board.get_selected_block(location, self._level).
+
+        The result is kept for the unit cell of <board> that <location> is in
+        and the requested level, and only looked up again once a block of
+        <board> is moved.  Every block begins at the edge of a unit cell, so
+        every location in a cell gives the same result.
+        """
+        version = board.structure_version()
+        if version != self._hits_version:
+            self._hits = {}
+            self._hits_version = version
+            self._cell_edges = (
+                cell_edges(board.position[0], board.size, board.max_depth),
+                cell_edges(board.position[1], board.size, board.max_depth))
+        columns, rows = self._cell_edges
+        # A location outside of the board is in the nearest cell.
+        cell = (max(bisect_right(columns, location[0]) - 1, 0),
+                max(bisect_right(rows, location[1]) - 1, 0))
+        key = (cell, self._level)
+        if key not in self._hits:
+            self._hits[key] = board.get_selected_block(location, self._level)
+        return self._hits[key]
+
     def make_move(self, board: Block) -> int:
         """Choose a move to make on the given board, and apply it, mutating
         the Board as appropriate.
@@ -180,28 +243,37 @@ class HumanPlayer(Player):
         """
         self._level = 0
         self._selected_block = board
+        self._hits_version = -1
 
         # Remove all previous events from the queue in case the other players
         # have added events to the queue accidentally.
         pygame.event.clear()
 
         # Keep checking the moves performed by the player until a valid move
-        # has been completed. Draw the board on every loop to draw the
-        # selected block properly on screen.
+        # has been completed.  Sleep until there are events to handle, and
+        # only draw the board again after handling them, at most FRAME_RATE
+        # times per second.
+        clock = pygame.time.Clock()
+        self.renderer.draw(board, self.id)
         while True:
-            self.renderer.draw(board, self.id)
-            # loop through all of the events within the event queue
-            # (all pending events from the user input)
-            for event in pygame.event.get():
+            events = [pygame.event.wait(EVENT_TIMEOUT)]
+            # handle every other event that arrived in the meantime at once
+            events.extend(pygame.event.get())
+            events = coalesce_motion([event for event in events
+                                      if event.type != pygame.NOEVENT])
+            for event in events:
                 if event.type == pygame.QUIT:
                     return 1
 
                 result = self.process_event(board, event)
-                self.renderer.draw(board, self.id)
                 if result is not None and result > 0:
                     # un-highlight the selected block
                     self._selected_block.highlighted = False
+                    self.renderer.draw(board, self.id)
                     return 0
+            if len(events) > 0:
+                self.renderer.draw(board, self.id)
+                clock.tick(FRAME_RATE)
 
 
 class RandomPlayer(Player):
@@ -241,7 +313,7 @@ class RandomPlayer(Player):
         rand_block = select_random_block(board)
         rand_block.highlighted = True
         self.renderer.draw(board, self.id)
-        pygame.time.wait(TIME_DELAY)
+        self.renderer.pause(TIME_DELAY)
         choice = random.randint(0, 4)
 
         if rand_block.level == rand_block.max_depth or rand_block.level == 0:
@@ -263,8 +335,9 @@ class SmartPlayer(Player):
         A Smart player.
 
         This player makes 'smart' decisions based on testing out a number of
-        random , this number is determined by the <difficulty> of the smart
-        player. A smartplayer is not allowed to perform a smash move.
+        different random moves, this number is determined by the <difficulty>
+        of the smart player. A smartplayer is not allowed to perform a smash
+        move.
 
         === Public Attributes ===
         num_smashes:
@@ -280,66 +353,374 @@ class SmartPlayer(Player):
         moves_to_check:
             This is the number of moves that the smart player checks before
             selecting the optimal move.
+        processes:
+            The number of worker processes that score the moves, or 0 to
+            score them in this process.
+        time_budget:
+            If not None, the number of milliseconds this player may spend
+            choosing each move.  It then tries as many moves as it can in
+            that time, in this process, instead of <moves_to_check> moves,
+            but always at least one.
+        evaluated:
+            The number of moves this player tried before its last move.
         === Representaion Invariant ===
             num_smashes == 0
+            processes >= 0
+            time_budget is None or time_budget > 0
 
         """
+    # === Private Attributes ===
+    # _pool:
+    #     The pool of worker processes that score the moves, or None if it
+    #     has not been started yet.
+    # _score_time:
+    #     A running estimate of the time, in seconds, that trying one move
+    #     takes this player under its time budget, or 0.0 before it has tried
+    #     any.
+    _pool: Optional[Pool]
+    _score_time: float
+
     def __init__(self, renderer: 'Renderer', player_id: int,
-                 goal: 'Goal', difficulty: int):
+                 goal: 'Goal', difficulty: int, processes: int = 0,
+                 time_budget: Optional[int] = None):
 
         Player.__init__(self, renderer, player_id, goal)
         self.num_smashes = 0
         self.moves_to_check = set_moves(difficulty)
+        self.processes = processes
+        self.time_budget = time_budget
+        self.evaluated = 0
+        self._pool = None
+        self._score_time = 0.0
 
     def make_move(self, board: Block) -> int:
         """
         Make a move based off testing a number of random moves based on the
-        smart players difficulty level, and picking the best move. Returns
-        0 when it makes a successful move.
+        smart players difficulty level, or on its time budget, and picking
+        the best move. Returns 0 when it makes a successful move.
         """
+        start = time.perf_counter()
         best_block = None
         best_move = None
         best_score = -(2 ** 5)  # lower bound on the score.
 
-        curr_score = self.goal.score(board)
-
-        for _ in range(self.moves_to_check):
+        # Pick every candidate first, so the random module is used in the
+        # same order however the candidates are scored.  The candidates are
+        # different moves that all change the board, with no smash allowed.
+        # Blocks are kept as their paths from the root, which the worker
+        # processes can follow on their own copy of the board.
+        if self.time_budget is not None:
+            candidates = [decode_move(move) for move in
+                          best_first(legal_moves(board))]
+        else:
+            candidates = [decode_move(move) for move in
+                          sample_moves(legal_moves(board),
+                                       self.moves_to_check)]
+        if len(candidates) == 0:  # no move can change the board.
+            self.evaluated = 0
+            return 0
+
+        if self.time_budget is not None:
+            deadline = start + self.time_budget / 1000
+            deltas, self._score_time = score_until(
+                board, self.goal, candidates, deadline, self._score_time)
+        elif self.processes > 0:
+            deltas = self._score_in_parallel(board, candidates)
+        else:
+            # the goal evaluates each move, and restores the board afterwards.
+            deltas = score_moves(board, self.goal, candidates)
+        self.evaluated = len(deltas)
 
-            temp_block = select_random_block(board)
-            move = random.randint(0, 3)  # 4 not included as no smash allowed
-            perform_move(temp_block, move)
-            new_score = self.goal.score(board)
-            if (new_score - curr_score) >= best_score:
-                best_block = temp_block
+        for (path, move), delta in zip(candidates, deltas):
+            if best_block is None or delta >= best_score:
+                best_block = path
                 best_move = move
-                best_score = new_score - curr_score
-            undo_move(temp_block, move)
+                best_score = delta
+        best_block = follow_path(board, best_block)
 
         # Apply the visual changes on the board
         best_block.highlighted = True
         self.renderer.draw(board, self.id)
-        pygame.time.wait(TIME_DELAY)
+        self.renderer.pause(TIME_DELAY)
         perform_move(best_block, best_move)
         best_block.highlighted = False
         self.renderer.draw(board, self.id)
 
         return 0
 
+    def _score_in_parallel(self, board: Block,
+                           candidates: List[Tuple[List[int], int]]) \
+            -> List[int]:
+        """Return the score_delta of each of the (path, move) <candidates>
+        on <board>, in order, computed by this SmartPlayer's worker processes.
+
+        Each worker gets a compact copy of <board> and one batch of the
+        candidates.
+        """
+        if self._pool is None:
+            self._pool = Pool(self.processes)
+        snapshot = compact_from_block(board)
+        batch_size = -(-len(candidates) // self.processes)  # rounded up
+        tasks = [(snapshot, type(self.goal), self.goal.colour,
+                  candidates[i:i + batch_size])
+                 for i in range(0, len(candidates), batch_size)]
+        deltas = []
+        for batch in self._pool.map(score_candidates, tasks):
+            deltas.extend(batch)
+        return deltas
+
+    def close(self) -> None:
+        """Stop this SmartPlayer's worker processes, if it has any.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+class MCTSPlayer(Player):
+    """
+    A player that chooses its moves with a Monte Carlo tree search.
+
+    The search tries sequences of swaps and rotations on the board, finishing
+    each with a few random moves, and scores the resulting board with this
+    player's goal.  The move that was explored the most is played.  The
+    search tree is kept after each move, and reused on the next turn if the
+    other players leave the board as this player expects.  An MCTSPlayer is
+    not allowed to perform a smash move, and its board must be a Block.
+
+    === Public Attributes ===
+    num_smashes:
+        number of smashes which this MCTSPlayer has available
+    renderer:
+        The object that draws our Blocky board on the screen
+        and tracks user interactions with the Blocky board.
+    id:
+        This player's number.  Used by the renderer to refer to the player,
+        for example as "Player 2"
+    goal:
+        This player's assigned goal for the game.
+    iterations:
+        The number of sequences of moves this player tries before each move.
+    time_budget:
+        If not None, the number of milliseconds this player may spend
+        choosing each move, instead of trying <iterations> sequences.
+    playout_depth:
+        The number of random moves made at the end of each sequence.
+    exploration:
+        How much the search favours moves it has tried less often over
+        moves that scored well.
+    evaluated:
+        The number of sequences this player tried before its last move.
+
+    === Representation Invariants ===
+        num_smashes == 0
+        iterations > 0
+        time_budget is None or time_budget > 0
+        playout_depth >= 0
+    """
+    # === Private Attributes ===
+    # _tree:
+    #     The node of the search tree for the board this player expects to
+    #     see on its next turn, or None if there is no search tree yet.
+    _tree: Optional['SearchNode']
+
+    def __init__(self, renderer: Renderer, player_id: int, goal: Goal,
+                 iterations: int = 500, time_budget: Optional[int] = None,
+                 playout_depth: int = 1, exploration: float = 1.4) -> None:
+        Player.__init__(self, renderer, player_id, goal)
+        self.num_smashes = 0
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.playout_depth = playout_depth
+        self.exploration = exploration
+        self.evaluated = 0
+        self._tree = None
+
+    def make_move(self, board: Block) -> int:
+        """
+        Search for the best move on <board>, and make it.  Returns 0 when it
+        makes a successful move, or when no move could change the board.
+        """
+        start = time.perf_counter()
+        if self._tree is not None and \
+                self._tree.board_hash == board.board_hash():
+            root = self._tree
+        else:
+            root = SearchNode(None, board.board_hash())
+
+        count = 0
+        if self.time_budget is None:
+            while count < self.iterations:
+                self._search(board, root)
+                count += 1
+        else:
+            deadline = start + self.time_budget / 1000
+            while count == 0 or time.perf_counter() < deadline:
+                self._search(board, root)
+                count += 1
+        self.evaluated = count
+
+        if len(root.children) == 0:  # no move can change the board.
+            self._tree = None
+            return 0
+        # Play the move explored the most, breaking ties by mean score.
+        best = root.children[0]
+        for child in root.children:
+            if (child.visits, child.total / child.visits) > \
+                    (best.visits, best.total / best.visits):
+                best = child
+        self._tree = best
+
+        path, move = decode_move(best.move)
+        best_block = follow_path(board, path)
+        best_block.highlighted = True
+        self.renderer.draw(board, self.id)
+        self.renderer.pause(TIME_DELAY)
+        perform_move(best_block, move)
+        best_block.highlighted = False
+        self.renderer.draw(board, self.id)
+        return 0
+
+    def _search(self, board: Block, root: 'SearchNode') -> None:
+        """Try one sequence of moves on <board>, starting from the search
+        tree node <root>, and add what it scored to the search tree.
 
-def undo_move(board: 'Block', option: int):
+        <board> is restored before returning.
+        """
+        node = root
+        visited = [root]
+        # Follow the most promising moves while all of them have been tried.
+        while node.untried is not None and len(node.untried) == 0 \
+                and len(node.children) > 0:
+            node = node.best_child(self.exploration)
+            push_search_move(board, node.move)
+            visited.append(node)
+
+        # Try a new move from there, if there is one.
+        if node.untried is None:
+            node.untried = legal_moves(board)
+            random.shuffle(node.untried)
+        if len(node.untried) > 0:
+            move = node.untried.pop()
+            push_search_move(board, move)
+            child = SearchNode(move, board.board_hash())
+            node.children.append(child)
+            visited.append(child)
+
+        # Finish with random moves, and score the board.
+        for _ in range(self.playout_depth):
+            select_random_block(board).push_move(random.randint(0, 3))
+        reward = self.goal.score(board)
+        for _ in range(len(visited) - 1 + self.playout_depth):
+            board.pop_move()
+
+        for node in visited:
+            node.visits += 1
+            node.total += reward
+
+
+class SearchNode:
     """
-    This is a helper fucnction for the make_move method for SmartPlayer.
-    given a <board>, and a move represented by <option> this function perform
-    the opposite to restore the board back to its original state.
+    A node in the search tree of an MCTSPlayer, which stands for the board
+    reached by a sequence of moves.
+
+    === Public Attributes ===
+    move:
+        The move made to reach this node from its parent, as an int from the
+        moves module, or None for the node the search started from.
+    board_hash:
+        The board_hash of the board this node stands for.
+    children:
+        The nodes reached from this one by one more move.
+    untried:
+        The moves from this node which do not have a node yet, or None if
+        they have not been listed yet.
+    visits:
+        The number of sequences of moves that have passed through this node.
+    total:
+        The sum of the scores of those sequences.
     """
-    if option == 0:
-        perform_move(board, 0)
-    elif option == 1:
-        perform_move(board, 1)
-    elif option == 2:
-        perform_move(board, 3)
-    elif option == 3:
-        perform_move(board, 2)
+    move: Optional[int]
+    board_hash: int
+    children: List['SearchNode']
+    untried: Optional[List[int]]
+    visits: int
+    total: float
+
+    def __init__(self, move: Optional[int], board_hash: int) -> None:
+        """Initialize this SearchNode, with no children and no visits.
+        """
+        self.move = move
+        self.board_hash = board_hash
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.total = 0
+
+    def best_child(self, exploration: float) -> 'SearchNode':
+        """Return the child of this node with the highest upper confidence
+        bound, weighting the exploration term by <exploration>.
+
+        Mean scores are divided by the highest mean among the children, so
+        the same <exploration> suits any goal and board size.
+
+        Precondition: every child has been visited at least once.
+        """
+        means = [child.total / child.visits for child in self.children]
+        scale = max(max(means), 1)
+        log_visits = math.log(self.visits)
+        best = None
+        best_bound = 0.0
+        for child, mean in zip(self.children, means):
+            bound = mean / scale + \
+                exploration * math.sqrt(log_visits / child.visits)
+            if best is None or bound > best_bound:
+                best = child
+                best_bound = bound
+        return best
+
+
+def push_search_move(board: Block, move: int) -> None:
+    """
+    This is a helper function for MCTSPlayer, which makes the int <move> from
+    the moves module on <board>, recording it with Block.push_move.
+    """
+    path, option = decode_move(move)
+    follow_path(board, path).push_move(option)
+
+
+def coalesce_motion(events: List[pygame.event.Event]) \
+        -> List[pygame.event.Event]:
+    """
+    This is a helper function for HumanPlayer.make_move, which returns
+    <events> without every MOUSEMOTION event but the last one.
+
+    The cursor position is read when an event is processed, not from the
+    event, so one motion event per batch selects the same block as all of
+    them.
+    """
+    last_motion = None
+    for event in events:
+        if event.type == pygame.MOUSEMOTION:
+            last_motion = event
+    return [event for event in events
+            if event.type != pygame.MOUSEMOTION or event is last_motion]
+
+
+def cell_edges(start: float, size: float, max_depth: int) -> List[float]:
+    """
+    This is a helper function for HumanPlayer, which returns the coordinates
+    at which each column of unit cells of a board of <max_depth> begins,
+    along a side of the board that begins at <start> and is <size> long.
+
+    Sizes are rounded as in Block.update_block_locations, so every block of
+    the board begins at one of them.
+    """
+    edges = [start]
+    for _ in range(max_depth):
+        size = round(size / 2.0)
+        edges = [edge + offset for edge in edges for offset in (0, size)]
+    return edges
 
 
 def set_moves(difficulty: int) -> int:
@@ -365,24 +746,61 @@ def set_moves(difficulty: int) -> int:
         return 150
 
 
-def perform_move(block: 'Block', option: int) -> None:
+def score_candidates(task: Tuple[CompactBlock, type, Tuple[int, int, int],
+                                  List[Tuple[List[int], int]]]) -> List[int]:
+    """
+    This is a helper function for SmartPlayer, run in its worker processes.
+    <task> holds a board, a Goal class and a colour, and a batch of moves
+    given as the path to a block from the root of the board and the move to
+    make on it.  Return the score_delta of each move for a goal of that class
+    and colour, in order.
+
+    The board is copied into a Block once per batch, so that the hashes of
+    its blocks are kept between the moves rather than computed again over
+    the whole board on every board_hash.
     """
-    This is a helper function for make_move in the RandomPlayer class, and it
-    makes a move on <block> based on the value of option.
+    board, goal_class, colour, moves = task
+    return score_moves(block_from_compact(board), goal_class(colour), moves)
+
 
-    preconditions:
-        0 <= option <= 4
+def score_moves(board: Block, goal: Goal,
+                moves: List[Tuple[List[int], int]]) -> List[int]:
     """
-    if option == 0:  # vertical swap
-        block.swap(0)
-    elif option == 1:  # horizontal swap
-        block.swap(1)
-    elif option == 2:  # rotate clockwise
-        block.rotate(1)
-    elif option == 3:  # rotate counter clockwise
-        block.rotate(3)
-    else:  # perform smash operation.
-        block.smash()
+    This is a helper function for SmartPlayer, which returns the score_delta
+    for <goal> of each of <moves> on <board>, in order.  Each move is given as
+    the path to a block from the root of <board> and the move to make on it.
+    """
+    return [goal.score_delta(board, follow_path(board, path), move)
+            for path, move in moves]
+
+
+def score_until(board: Block, goal: Goal,
+                moves: List[Tuple[List[int], int]], deadline: float,
+                estimate: float = 0.0) -> Tuple[List[int], float]:
+    """
+    This is a helper function for SmartPlayer, which returns the score_delta
+    for <goal> of as many of <moves> on <board> as can be scored before the
+    time.perf_counter() value <deadline>, in order, starting from the first.
+    Moves are given as in score_moves.  At least one move is always scored.
+
+    After the first, a move is only scored if it is expected to be done
+    before the deadline, going by <estimate>, the time in seconds that
+    scoring a move takes, or 0.0 if it is not known yet.  Also return
+    <estimate>, moved towards the time each move scored here took, so that
+    one slow move is soon forgotten.
+    """
+    deltas = []
+    for path, move in moves:
+        start = time.perf_counter()
+        if len(deltas) > 0 and start + estimate >= deadline:
+            break
+        deltas.append(goal.score_delta(board, follow_path(board, path), move))
+        elapsed = time.perf_counter() - start
+        if estimate == 0.0:
+            estimate = elapsed
+        else:
+            estimate += SCORE_TIME_WEIGHT * (elapsed - estimate)
+    return deltas, estimate
 
 
 def select_random_block(board: 'Block') -> 'Block':
@@ -406,9 +824,10 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-io': ['process_event'],
         'allowed-import-modules': [
-            'doctest', 'python_ta', 'random', 'typing',
-            'block', 'goal', 'player', 'renderer',
-            'pygame'
+            'doctest', 'python_ta', 'random', 'typing', 'time', 'math',
+            'block', 'goal', 'player', 'renderer', 'compact_block', 'moves',
+            'bisect',
+            'pygame', 'multiprocessing'
         ],
         'max-attributes': 10,
         'generated-members': 'pygame.*'
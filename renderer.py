@@ -10,7 +10,8 @@ University of Toronto
 
 This file contains the Renderer class.
 """
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+import numpy
 import pygame
 
 WHITE = (255, 255, 255)
@@ -23,6 +24,9 @@ DAFFODIL_DELIGHT = (255, 211, 92)
 TEMPTING_TURQUOISE = (75, 196, 213)
 COLOUR_LIST = [PACIFIC_POINT, REAL_RED, OLD_OLIVE, DAFFODIL_DELIGHT]
 COLOUR_NAMES = ['Pacific Point', 'Real Red', 'Old Olive', 'Daffodil Delight']
+# COLOUR_TABLE[i] is COLOUR_LIST[i], so that an array of indexes into
+# COLOUR_LIST can be turned into colours all at once.
+COLOUR_TABLE = numpy.array(COLOUR_LIST, dtype=numpy.uint8)
 
 BOARD_WIDTH = 750
 BOARD_HEIGHT = 750
@@ -39,6 +43,16 @@ def colour_name(colour: Tuple[int, int, int]) -> str:
     return ''
 
 
+def colour_index(colour: Tuple[int, int, int]) -> int:
+    """Return the index of this colour value in COLOUR_LIST, or -1 if
+    this colour value isn't in our colour list.
+    """
+    for i in range(len(COLOUR_LIST)):
+        if COLOUR_LIST[i] == colour:
+            return i
+    return -1
+
+
 class Renderer:
     """
     A class designed to handle the drawing and context for the board
@@ -56,6 +70,22 @@ class Renderer:
     screen: pygame.Surface
     window_size: Tuple[int, int]
     player_labels: List[pygame.Surface]
+    # === Private Attributes ===
+    # _board:
+    #     The board on the screen, or None if the screen shows something else.
+    #     Only the parts of it that have changed are drawn again.
+    # _player_id:
+    #     The id of the player whose label is on the screen.
+    # _tiles:
+    #     Ready-made surfaces of blocks, by (colour, size, highlighted), as
+    #     _draw_rectangles would draw a block of that colour and size at the
+    #     upper left corner of an empty surface.  A colour of None stands for
+    #     a subdivided block, of which only the highlighted border is drawn,
+    #     and the rest is left out by its colour key.
+    _board: Optional['Block']
+    _player_id: int
+    _tiles: Dict[Tuple[Optional[Tuple[int, int, int]], int, bool],
+                 pygame.Surface]
 
     def __init__(self, num_players: int) -> None:
         """Initialize this renderer.
@@ -71,6 +101,9 @@ class Renderer:
             self.displayed_image.subsurface(((0, 0),
                                              (BOARD_WIDTH, BOARD_HEIGHT)))
         self.screen.fill(WHITE)
+        self._board = None
+        self._player_id = 0
+        self._tiles = {}
 
         font = pygame.font.SysFont(None, 25)
         self.player_labels = [
@@ -99,29 +132,132 @@ class Renderer:
                         (255, 255, 255)), (0, BOARD_HEIGHT + 50)
         )
 
+    def pause(self, milliseconds: int) -> None:
+        """Wait for <milliseconds>, so that a move can be seen on screen."""
+        pygame.time.wait(milliseconds)
+
     def draw(self, board: 'Block', player_id: int) -> None:
-        """Clear the canvas and draw the blocks."""
-        # draw the background map onto the screen
-        self.screen.fill(WHITE)
+        """Draw the blocks of <board> and the label of player <player_id>.
+
+        If <board> is already on the screen, only the parts of it that have
+        changed since it was last drawn are drawn again, and only they are
+        updated on the display.  Blocks are blitted from ready-made tiles,
+        which are built when a board is first drawn.
+        """
+        areas = board.changed_areas()
+        if board is not self._board:
+            self._build_tiles(board)
+        if board is not self._board or \
+                any(area[2] >= board.size for area in areas):
+            self.screen.fill(WHITE)
+            self._draw_tiles(self.screen, board.rectangles_to_draw())
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = []
+            for x, y, width, height in areas:
+                # Neighbouring blocks may overlap this one by a pixel after
+                # rounding, so take them in as well.
+                area = (x - 1, y - 1, width + 2, height + 2)
+                rect = pygame.Rect(area).clip(self.screen.get_rect())
+                self.screen.set_clip(rect)
+                self.screen.fill(WHITE, rect)
+                self._draw_tiles(self.screen, board.rectangles_to_draw(area))
+                dirty.append(rect)
+            self.screen.set_clip(None)
 
+        if board is not self._board or player_id != self._player_id:
+            label = self.player_labels[player_id]
+            self.displayed_image.blit(label, (0, BOARD_HEIGHT))
+            dirty.append(label.get_rect(topleft=(0, BOARD_HEIGHT)))
+        self._board = board
+        self._player_id = player_id
+        if len(dirty) > 0:
+            pygame.display.update(dirty)
+
+        # Check for new events; this should avoid the OSX issue for delayed
+        # updating of the pygame window.
+        pygame.event.peek([])
+
+    def _draw_rectangles(self, surface: pygame.Surface,
+                         rectangles: List[Tuple]) -> None:
+        """Draw <rectangles>, in the format returned by
+        Block.rectangles_to_draw, onto <surface>, with highlighted
+        rectangle borders last.
+        """
         selected = []
-        for colour, pos, size, width in board.rectangles_to_draw():
+        for colour, pos, size, width in rectangles:
             if colour == TEMPTING_TURQUOISE:
                 selected.append((colour, pos, size, width))
             else:
-                pygame.draw.rect(self.screen, colour, (pos, size), width)
+                pygame.draw.rect(surface, colour, (pos, size), width)
 
         # Draw highlighted rectangle borders last
         for colour, x, y, width in selected:
-            pygame.draw.rect(self.screen, colour, (x, y), width)
+            pygame.draw.rect(surface, colour, (x, y), width)
 
-        self.displayed_image.blit(
-            self.player_labels[player_id], (0, BOARD_HEIGHT))
-        pygame.display.update()
+    def _build_tiles(self, board: 'Block') -> None:
+        """Make sure there is a tile for every colour, size and highlighting
+        that a block of <board> can have.
 
-        # Check for new events; this should avoid the OSX issue for delayed
-        # updating of the pygame window.
-        pygame.event.peek([])
+        Blocks of the same level all have the same size, so there are only
+        a few tiles for each level of the board.
+        """
+        size = board.size
+        for _ in range(board.level, board.max_depth + 1):
+            for colour in COLOUR_LIST + [None]:
+                for highlighted in [False, True]:
+                    if colour is not None or highlighted:
+                        self._tile(colour, size, highlighted)
+            size = round(size / 2.0)
+
+    def _tile(self, colour: Optional[Tuple[int, int, int]], size: float,
+              highlighted: bool) -> pygame.Surface:
+        """Return the tile for a block of <colour> and <size>, highlighted if
+        <highlighted> is True, making it if it is not in _tiles yet.
+        """
+        key = (colour, int(size), highlighted)
+        if key not in self._tiles:
+            tile = pygame.Surface((key[1], key[1]), 0, self.screen)
+            rectangles = []
+            if colour is None:
+                tile.fill(WHITE)
+                tile.set_colorkey(WHITE)
+            else:
+                rectangles.append((colour, (0, 0), (size, size), 0))
+                rectangles.append((BLACK, (0, 0), (size, size), 3))
+            if highlighted:
+                rectangles.append((TEMPTING_TURQUOISE, (0, 0), (size, size),
+                                   5))
+            self._draw_rectangles(tile, rectangles)
+            self._tiles[key] = tile
+        return self._tiles[key]
+
+    def _draw_tiles(self, surface: pygame.Surface,
+                    rectangles: List[Tuple]) -> None:
+        """Draw <rectangles>, in the format returned by
+        Block.rectangles_to_draw, onto <surface> as _draw_rectangles does,
+        but with one tile blitted for each block, all in one batch.
+
+        Highlighted blocks come last, so that their borders are on top of
+        the blocks next to them, where they overlap after rounding.
+        """
+        # The colour of each highlighted block, or None if it is subdivided.
+        selected = {(pos, size): None
+                    for colour, pos, size, width in rectangles
+                    if colour == TEMPTING_TURQUOISE}
+        for colour, pos, size, width in rectangles:
+            if width == 0 and (pos, size) in selected:
+                selected[(pos, size)] = colour
+
+        tiles = []
+        highlighted = []
+        for colour, pos, size, width in rectangles:
+            if colour == TEMPTING_TURQUOISE:
+                highlighted.append((self._tile(selected[(pos, size)],
+                                               size[0], True), pos))
+            elif width == 0 and (pos, size) not in selected:
+                tiles.append((self._tile(colour, size[0], False), pos))
+        surface.blits(tiles + highlighted, False)
 
     # For game start
     def display_goal(self, player: 'Player') -> None:
@@ -139,6 +275,8 @@ class Renderer:
         """
         screen = self.screen
         screen.fill(colour)
+        # The board is covered, so it must all be drawn again afterwards.
+        self._board = None
         font = pygame.font.Font(None, 18)
         rect = pygame.Rect([0, 0, 400, 22])
         rect.center = screen.get_rect().center
@@ -155,18 +293,140 @@ class Renderer:
 
         pygame.display.flip()
 
-        # Wait for user click
-        while True:
-            events = pygame.event.get()
-            for e in events:
-                if e.type == pygame.MOUSEBUTTONDOWN:
-                    return
+        # Sleep until the user clicks
+        while pygame.event.wait().type != pygame.MOUSEBUTTONDOWN:
+            pass
+
+
+class ArrayRenderer(Renderer):
+    """
+    A renderer which draws the colours of a whole board at once, from its
+    flattened form, instead of one rectangle per block, for deep boards.
+
+    The colour of every unit cell is put on a surface with one pixel per
+    cell, which is scaled up to the size of the board in one blit.  The
+    frames and highlighted borders of the blocks are drawn on a separate
+    layer on top, which is kept between calls to draw, and only drawn again
+    where the board has changed, as in Renderer.draw.
+
+    === Attributes ===
+    Those of a Renderer.
+    """
+    # === Private Attributes ===
+    # _frames:
+    #     The frames and highlighted borders of the blocks of _board, on a
+    #     background of WHITE, which is not drawn when the layer is blitted.
+    # _cells:
+    #     A surface with one pixel for each unit cell of _board.
+    # _target:
+    #     The part of the screen that _board covers, which _cells is scaled
+    #     up onto.
+    _frames: pygame.Surface
+    _cells: Optional[pygame.Surface]
+    _target: Optional[pygame.Surface]
+
+    def __init__(self, num_players: int) -> None:
+        """Initialize this renderer, as a Renderer.
+        """
+        super().__init__(num_players)
+        self._frames = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        self._frames.set_colorkey(WHITE)
+        self._cells = None
+        self._target = None
+
+    def draw(self, board: 'Block', player_id: int) -> None:
+        """Draw the blocks of <board> and the label of player <player_id>.
+
+        If <board> was drawn last, only the frames where it has changed since
+        then are drawn again.
+        """
+        areas = board.changed_areas()
+        if board is not self._board:
+            self.screen.fill(WHITE)
+            width = 2 ** board.max_depth
+            self._cells = pygame.Surface((width, width), 0, self.screen)
+            self._target = self.screen.subsurface(
+                (board.position, (board.size, board.size)))
+        if board is not self._board or \
+                any(area[2] >= board.size for area in areas):
+            self._frames.fill(WHITE)
+            self._draw_rectangles(self._frames,
+                                  frame_rectangles(board.rectangles_to_draw()))
+        else:
+            for x, y, width, height in areas:
+                area = (x - 1, y - 1, width + 2, height + 2)
+                rect = pygame.Rect(area).clip(self._frames.get_rect())
+                self._frames.set_clip(rect)
+                self._frames.fill(WHITE, rect)
+                self._draw_rectangles(
+                    self._frames,
+                    frame_rectangles(board.rectangles_to_draw(area)))
+            self._frames.set_clip(None)
+        self._board = board
+        self._player_id = player_id
+
+        pygame.surfarray.blit_array(self._cells,
+                                    COLOUR_TABLE[board.flatten_array()])
+        pygame.transform.scale(self._cells, self._target.get_size(),
+                               self._target)
+        self.screen.blit(self._frames, (0, 0))
+        self.displayed_image.blit(self.player_labels[player_id],
+                                  (0, BOARD_HEIGHT))
+        pygame.display.update()
+
+        # Check for new events; this should avoid the OSX issue for delayed
+        # updating of the pygame window.
+        pygame.event.peek([])
+
+
+def frame_rectangles(rectangles: List[Tuple]) -> List[Tuple]:
+    """
+    This is a helper function for ArrayRenderer, which returns the
+    rectangles in <rectangles>, in the format returned by
+    Block.rectangles_to_draw, that are frames or highlighted borders rather
+    than filled with the colour of a block.
+    """
+    return [rectangle for rectangle in rectangles if rectangle[3] > 0]
+
+
+class NullRenderer(Renderer):
+    """
+    A renderer which draws nothing and never waits, for running games of
+    computer players at full speed, without a display or a pygame window.
+
+    It has the same methods as a Renderer, but none of its attributes, and
+    it cannot be used by a HumanPlayer, which needs pygame events.
+
+    === Attributes ===
+    num_players:
+        The total number of players in the Game.
+    """
+    num_players: int
+
+    def __init__(self, num_players: int) -> None:
+        """Initialize this renderer.  Unlike a Renderer, this does not
+        initialize pygame.
+        """
+        self.num_players = num_players
+
+    def pause(self, milliseconds: int) -> None:
+        """Return immediately."""
+
+    def draw(self, board: 'Block', player_id: int) -> None:
+        """Do nothing."""
+
+    def display_goal(self, player: 'Player') -> None:
+        """Do nothing."""
+
+    def _message_box(self, colour: Tuple[int, int, int], message: str) -> None:
+        """Do nothing, and do not wait for a click."""
+
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'allowed-import-modules': [
-            'doctest', 'python_ta', 'random', 'typing',
+            'doctest', 'python_ta', 'random', 'typing', 'numpy',
             'block', 'goal', 'player', 'renderer',
             'pygame'
         ],
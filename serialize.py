@@ -0,0 +1,224 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains functions to save Blocky boards as compact bytes and load
+them again, and the BoardArchive class, which reads one board at a time from
+a file holding any number of boards, without loading the whole file.
+
+A board is saved as one byte holding its max_depth, followed by its blocks
+in pre-order, packed into bits from the most significant bit of each byte.
+Each block above the maximum depth starts with one bit, which is 1 iff the
+block is subdivided; blocks at the maximum depth cannot be, so they have no
+such bit.  An undivided block is followed by two bits for the index of its
+colour in COLOUR_LIST.  The last byte is padded with 0 bits.
+
+An archive file starts with ARCHIVE_MAGIC, the number of boards and the
+position of its index, then holds the saved boards back to back, followed by
+the index: the position of the start of every board in the file, and of the
+end of the last one, each as an 8-byte little-endian int.
+"""
+import mmap
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+import numpy
+from block import Block
+from renderer import COLOUR_LIST, colour_index
+
+# The first bytes of every archive file.
+ARCHIVE_MAGIC = b'BLKYARC1'
+# The layout of the header of an archive: ARCHIVE_MAGIC, the number of boards
+# and the position of the index.
+ARCHIVE_HEADER = struct.Struct('<8sQQ')
+
+
+def serialize_board(board: Block) -> bytes:
+    """Return the bytes that <board>, the root of a board, is saved as.
+
+    <board> may also be a CompactBlock or a PersistentBlock.
+
+    >>> len(serialize_board(Block(0, COLOUR_LIST[2])))
+    2
+    """
+    bits = []
+    write_block(board, bits)
+    # packbits fills each byte from its most significant bit, and pads the
+    # last byte with 0 bits.
+    return bytes([board.max_depth]) + \
+        numpy.packbits(numpy.array(bits, dtype=numpy.uint8)).tobytes()
+
+
+def write_block(block: Block, bits: List[int]) -> None:
+    """
+    This is a helper function for serialize_board, which appends the bits of
+    <block> and all of its descendants, in pre-order, to <bits>.
+    """
+    children = block.children
+    if block.level < block.max_depth:
+        bits.append(1 if len(children) > 0 else 0)
+    if len(children) == 0:
+        index = colour_index(block.colour)
+        bits.append(index >> 1)
+        bits.append(index & 1)
+    else:
+        for child in children:
+            write_block(child, bits)
+
+
+def deserialize_board(data: bytes) -> Block:
+    """Return a new Block board, at level 0, from the bytes <data> returned
+    by serialize_board.
+
+    The Block has no position or size yet.  They can be set with
+    update_block_locations.
+    """
+    max_depth = data[0]
+    bits = numpy.unpackbits(
+        numpy.frombuffer(data, dtype=numpy.uint8, offset=1)).tolist()
+    block, _ = read_block(bits, 0, 0, max_depth)
+    return block
+
+
+def read_block(bits: List[int], start: int, level: int,
+               max_depth: int) -> Tuple[Block, int]:
+    """
+    This is a helper function for deserialize_board.  <bits> are the bits of
+    a saved board.  Read a block at <level> from them, starting at index
+    <start>, and return it, along with the index of the first bit after it.
+    """
+    split = False
+    if level < max_depth:
+        split = bits[start] == 1
+        start += 1
+    if split:
+        children = []
+        for _ in range(4):
+            child, start = read_block(bits, start, level + 1, max_depth)
+            children.append(child)
+        block = Block(level, children=children)
+    else:
+        block = Block(level, COLOUR_LIST[2 * bits[start] + bits[start + 1]])
+        start += 2
+    block.max_depth = max_depth
+    return block, start
+
+
+def write_archive(path: str, boards: Iterable[Block]) -> int:
+    """Save every board in <boards> to a new archive file at <path>, in
+    order, and return the number of boards saved.
+
+    The boards are written as they are produced, so <boards> may be a
+    generator of more boards than fit in memory at once.
+    """
+    offsets = []
+    with open(path, 'wb') as archive:
+        archive.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, 0, 0))
+        position = ARCHIVE_HEADER.size
+        for board in boards:
+            data = serialize_board(board)
+            offsets.append(position)
+            archive.write(data)
+            position += len(data)
+        offsets.append(position)
+        archive.write(numpy.array(offsets, dtype='<u8').tobytes())
+        archive.seek(0)
+        archive.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(offsets) - 1,
+                                          position))
+    return len(offsets) - 1
+
+
+class BoardArchive:
+    """An archive file of saved boards, opened for reading.
+
+    The file is memory-mapped, so only the parts of it that are read are
+    loaded, and any board can be read directly by its index.
+
+    === Public Attributes ===
+    path:
+        The path of the archive file.
+    """
+    path: str
+    # === Private Attributes ===
+    # _file:
+    #     The open archive file.
+    # _map:
+    #     The memory map of the whole file.
+    # _offsets:
+    #     The index of the archive, read straight from _map: the position of
+    #     the start of each board, followed by the end of the last board.
+    _file: BinaryIO
+    _map: mmap.mmap
+    _offsets: numpy.ndarray
+
+    def __init__(self, path: str) -> None:
+        """Open the archive file at <path>.
+
+        Raise ValueError if it is not an archive file.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, index = ARCHIVE_HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a board archive')
+        self._offsets = numpy.frombuffer(self._map, dtype='<u8',
+                                         count=count + 1, offset=index)
+
+    def __len__(self) -> int:
+        """Return the number of boards in this archive."""
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> Block:
+        """Return a new Block board loaded from board <index> of this
+        archive.
+        """
+        return deserialize_board(self.board_bytes(index))
+
+    def __iter__(self) -> Iterator[Block]:
+        """Return an iterator over the boards of this archive, in order."""
+        for index in range(len(self)):
+            yield self[index]
+
+    def board_bytes(self, index: int) -> bytes:
+        """Return the saved bytes of board <index> of this archive.
+
+        Raise IndexError if there is no such board.
+        """
+        if not -len(self) <= index < len(self):
+            raise IndexError('board index out of range')
+        index %= len(self)
+        start = int(self._offsets[index])
+        end = int(self._offsets[index + 1])
+        return self._map[start:end]
+
+    def close(self) -> None:
+        """Close this archive.  No boards can be read from it afterwards."""
+        # The index is a view into the map, which must be released first.
+        self._offsets = numpy.zeros(1, dtype='<u8')
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'BoardArchive':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', 'mmap', 'struct', 'numpy',
+            'block', 'renderer'
+        ],
+    })
+    import doctest
+    doctest.testmod()
@@ -13,10 +13,21 @@ Please use this as a starting point to check your work and write your own
 tests!
 """
 from typing import List, Tuple
-from renderer import COLOUR_LIST
-from block import Block
-from goal import PerimeterGoal, BlobGoal
+import os
+import numpy
+import pygame
+from renderer import COLOUR_LIST, Renderer, ArrayRenderer, NullRenderer
+from block import Block, perform_move, undo_move, random_init
+from compact_block import compact_from_block, block_from_compact, \
+    random_compact_boards, random_grids
+from persistent import persistent_from_block
+from serialize import serialize_board, deserialize_board, write_archive, \
+    BoardArchive
+from goal import PerimeterGoal, BlobGoal, blob_sizes, leaf_blob_sizes
 from game import Game
+from env import VecBlockyEnv
+from player import MCTSPlayer, HumanPlayer, coalesce_motion
+from moves import legal_moves, encode_move, decode_move, make_move
 
 
 def test_flatten() -> None:
@@ -37,6 +48,89 @@ def test_flatten() -> None:
         'Result of flatten is incorrect.'
 
 
+def test_flatten_cache() -> None:
+    """Test that flatten stays correct after moves, and that quadrants
+    untouched by a move are not rebuilt.
+    """
+    board, flatten_expected = construct_board()
+    assert board.flatten() == flatten_expected
+    untouched = board.children[1].flatten()
+
+    board.children[0].rotate(1)
+    board.children[0].rotate(3)
+    assert board.flatten() == flatten_expected
+    assert board.children[1].flatten() is untouched
+
+    board.swap(0)
+    board.swap(0)
+    assert board.flatten() == flatten_expected
+
+
+def test_flatten_array() -> None:
+    """Test that flatten_array holds the COLOUR_LIST index of every cell
+    returned by flatten.
+    """
+    board, flatten_expected = construct_board()
+    expected = [[COLOUR_LIST.index(colour) for colour in column]
+                for column in flatten_expected]
+
+    assert board.flatten_array().tolist() == expected
+    board.swap(1)
+    board.swap(1)
+    assert board.flatten_array().tolist() == expected
+
+
+def test_board_hash() -> None:
+    """Test that board_hash follows the unit cells of the board through
+    moves, and not the way the board is subdivided.
+    """
+    board, _ = construct_board()
+    original = board.board_hash()
+
+    board.swap(0)
+    assert board.board_hash() != original
+    board.swap(0)
+    assert board.board_hash() == original
+
+    board.rotate(1)
+    assert board.board_hash() != original
+    board.rotate(3)
+    assert board.board_hash() == original
+
+    # A quadrant split into four children of its own colour has the same
+    # unit cells, so the same hash, and rotating it changes nothing.
+    split = Block(1, children=[Block(2, COLOUR_LIST[2]) for _ in range(4)])
+    split.max_depth = 2
+    for child in split.children:
+        child.max_depth = 2
+    solid = board.children[1]
+    board.children = [board.children[0], split] + board.children[2:]
+    assert board.board_hash() == original
+    split.rotate(1)
+    assert board.board_hash() == original
+    assert split.board_hash() == solid.board_hash()
+
+
+def test_held_block_after_rotation() -> None:
+    """Test that a Block reached before the Block containing it is rotated
+    is moved, flattened and placed where it is on the board afterwards.
+    """
+    board, _ = construct_board()
+    board.update_block_locations((0, 0), 64)
+    held = board.children[0]
+    board.rotate(1)
+    held.swap(0)
+
+    expected, _ = construct_board()
+    expected.update_block_locations((0, 0), 64)
+    expected.rotate(1)
+    expected.children[3].swap(0)
+    assert board.flatten() == expected.flatten()
+    assert held.flatten() == expected.children[3].flatten()
+    assert held.position == expected.children[3].position
+    assert held.board_hash() == expected.children[3].board_hash()
+
+
 def test_rectangles_to_draw() -> None:
     """Test the rectangles_to_draw method of the Block class.
     """
@@ -124,6 +218,11 @@ def test_get_selected_block():
     assert equal_boards(board,
                         board.get_selected_block((40, 10), 0))
 
+    # A location near the corner of a big block is in that block, even
+    # though the centre of a smaller neighbouring block is closer to it.
+    board.update_block_locations((0, 0), 64)
+    assert board.get_selected_block((30, 2), 2) is board.children[1]
+
     # Always needs to return a block
     assert board.get_selected_block((100, 100), 0) is not None
     assert board.get_selected_block((-10, -10), 0) is not None
@@ -193,6 +292,28 @@ def test_rotate():
     assert equal_boards(board, ref_board)
 
 
+def test_rotate_whole_board():
+    """Test that rotating the root block rotates every descendant, both in
+    the flattened board and in the positions of the blocks.
+    """
+    board, flatten_expected = construct_board()
+    board.update_block_locations((0, 0), 64)
+    size = len(flatten_expected)
+
+    board.rotate(1)
+    rotated = [[flatten_expected[row][size - 1 - col] for row in range(size)]
+               for col in range(size)]
+    assert board.flatten() == rotated
+    # The subdivided upper right quadrant is now the lower right one, and
+    # its cells have been moved accordingly.
+    assert len(board.children[3].children) == 4
+    assert board.children[3].children[3].position == (48, 48)
+    assert board.children[3].children[3].colour == COLOUR_LIST[0]
+
+    board.rotate(3)
+    assert board.flatten() == flatten_expected
+
+
 def test_smash():
     """Test to see if the block's children change after the smash operation.
 
@@ -239,6 +360,131 @@ def test_blob_goal():
         assert goal.score(board) == score
 
 
+def test_random_compact_boards():
+    """Test that bulk generated boards are the same for the same seed, and
+    that random_grids gives their flattened forms.
+    """
+    boards = random_compact_boards(20, 4, seed=148)
+    grids = random_grids(20, 4, seed=148)
+    assert grids.shape == (20, 16, 16)
+    for board, grid in zip(boards, grids):
+        assert board.flatten_array().tolist() == grid.tolist()
+    again = random_compact_boards(20, 4, seed=148)
+    assert [board.board_hash() for board in boards] == \
+        [board.board_hash() for board in again]
+
+
+def test_changed_areas():
+    """Test that only the blocks moved or highlighted since the last call are
+    reported, and not those within another changed block, and that nothing
+    is recorded before the first call.
+    """
+    board, _ = construct_board()
+    board.update_block_locations((0, 0), 750)
+    board.children[0].swap(0)
+    board.children[0].swap(0)
+    assert board._board_state().changed == {}
+    assert board.changed_areas() == []
+    board.children[0].children[2].highlighted = True
+    assert board.changed_areas() == [(375, 188, 188, 188)]
+    board.children[2].highlighted = True
+    board.children[0].children[1].swap(0)
+    board.children[0].rotate(1)
+    assert board.changed_areas() == [(0, 375, 375, 375), (375, 0, 375, 375)]
+    rectangles = board.rectangles_to_draw((0, 400, 10, 10))
+    assert len(rectangles) == 3
+    assert all(rectangle[1] == (0.0, 375.0) for rectangle in rectangles)
+
+
+def test_human_hit_test():
+    """Test that a HumanPlayer finds the same selected block as
+    get_selected_block, before and after the board changes, and that only
+    the last of a batch of mouse motion events is kept.
+    """
+    board, _ = construct_board()
+    board.update_block_locations((0, 0), 750)
+    player = HumanPlayer(NullRenderer(1), 0, BlobGoal(COLOUR_LIST[0]))
+    player._level = 2
+    version = board.structure_version()
+    for location in [(600, 100), (700, 150), (374, 375), (800, -5)]:
+        assert player._hit_test(board, location) is \
+            board.get_selected_block(location, 2)
+    board.children[0].rotate(1)
+    assert board.structure_version() != version
+    assert player._hit_test(board, (600, 100)) is \
+        board.get_selected_block((600, 100), 2)
+
+    events = [pygame.event.Event(pygame.MOUSEMOTION, pos=(1, 1)),
+              pygame.event.Event(pygame.KEYDOWN, key=pygame.K_h),
+              pygame.event.Event(pygame.MOUSEMOTION, pos=(2, 2))]
+    assert coalesce_motion(events) == events[1:]
+
+
+def test_array_renderer():
+    """Test that an ArrayRenderer draws the same picture as a Renderer,
+    after a move and a highlight, and when a compact board is drawn again,
+    without a window on the screen.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    board, _ = construct_board()
+    board.update_block_locations((0, 0), 750)
+    renderer = Renderer(1)
+    array_renderer = ArrayRenderer(1)
+    array_renderer.draw(board, 0)
+    board.children[0].rotate(1)
+    board.children[2].highlighted = True
+    array_renderer.draw(board, 0)
+    drawn = pygame.surfarray.array3d(array_renderer.screen)
+    renderer.draw(board, 0)
+    assert (pygame.surfarray.array3d(renderer.screen) == drawn).all()
+
+    compact = compact_from_block(board)
+    array_renderer.draw(compact, 0)
+    compact.children[1].rotate(1)
+    array_renderer.draw(compact, 0)
+    drawn = pygame.surfarray.array3d(array_renderer.screen)
+    renderer.draw(compact, 0)
+    assert (pygame.surfarray.array3d(renderer.screen) == drawn).all()
+    pygame.quit()
+
+
+def test_renderer_tiles():
+    """Test that a Renderer blitting its cached tiles draws the same pixels
+    as drawing every rectangle, with highlighted blocks and after a partial
+    redraw.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    board, _ = construct_board()
+    board.update_block_locations((0, 0), 750)
+    renderer = Renderer(1)
+    renderer.draw(board, 0)
+    board.children[0].highlighted = True
+    board.children[0].children[2].highlighted = True
+    board.children[3].swap(1)
+    renderer.draw(board, 0)
+
+    expected = pygame.Surface(renderer.screen.get_size())
+    expected.fill((255, 255, 255))
+    renderer._draw_rectangles(expected, board.rectangles_to_draw())
+    assert (pygame.surfarray.array3d(renderer.screen) ==
+            pygame.surfarray.array3d(expected)).all()
+    pygame.quit()
+
+
+def test_blob_sizes():
+    """Test that the blob sizes of every colour are found in one pass, and
+    that a board too big for a recursive search can be scored.
+    """
+    board, _ = construct_board()
+    assert blob_sizes(board.flatten_array()) == [1, 4, 4, 5]
+    assert leaf_blob_sizes(board) == [1, 4, 4, 5]
+
+    big_board = Block(0, COLOUR_LIST[3])
+    big_board.max_depth = 7
+    assert BlobGoal(COLOUR_LIST[3]).score(big_board) == 2 ** 14
+    assert BlobGoal(COLOUR_LIST[0]).score(big_board) == 0
+
+
 def test_perimeter_goal():
     """
     Test the blob goal for the given board
@@ -258,6 +504,160 @@ def test_perimeter_goal():
     for colour, score in correct_scores:
         goal = PerimeterGoal(colour)
         assert goal.score(board) == score
+        assert goal.score_grid(board.flatten_array()) == score
+
+
+def test_compact_board() -> None:
+    """Test that a CompactBoard holds the same board as the Block it was
+    built from, and that moves change both in the same way.
+    """
+    board, flatten_expected = construct_board()
+    board.update_block_locations((0, 0), 64)
+    compact = compact_from_block(board)
+
+    assert compact.flatten() == flatten_expected
+    assert set(compact.rectangles_to_draw()) == \
+        set(board.rectangles_to_draw())
+
+    for b in [board, compact]:
+        b.children[0].rotate(1)
+        b.swap(1)
+    assert compact.flatten() == board.flatten()
+    assert compact.get_selected_block((40, 60), 2).position == \
+        board.get_selected_block((40, 60), 2).position
+    for colour in COLOUR_LIST:
+        assert BlobGoal(colour).score(compact) == BlobGoal(colour).score(board)
+
+    copy = block_from_compact(compact)
+    assert copy.flatten() == board.flatten()
+    assert copy.board_hash() == compact.board_hash()
+    assert set(copy.rectangles_to_draw()) == set(board.rectangles_to_draw())
+
+
+def test_score_delta():
+    """Test that score_delta gives the change in score a move would make,
+    and leaves the board as it was.
+    """
+    board, flatten_expected = construct_board()
+    blocks = [board, board.children[0], board.children[0].children[2],
+              board.children[3]]
+
+    for goal in [BlobGoal(COLOUR_LIST[1]), PerimeterGoal(COLOUR_LIST[3])]:
+        for block in blocks:
+            for move in range(4):
+                before = goal.score(board)
+                delta = goal.score_delta(board, block, move)
+                assert board.flatten() == flatten_expected
+                perform_move(block, move)
+                assert goal.score(board) - before == delta
+                undo_move(block, move)
+
+
+def test_push_pop_move():
+    """Test that moves recorded with push_move, including smashes, are undone
+    by pop_move in reverse order, and that a copy is not changed by them.
+    """
+    import random
+    random.seed(148)
+    board, flatten_expected = construct_board()
+    copy = board.copy()
+
+    board.children[0].push_move(2)
+    board.children[3].push_move(4)
+    board.push_move(1)
+    assert copy.flatten() == flatten_expected
+    for _ in range(3):
+        board.pop_move()
+    assert board.flatten() == flatten_expected
+    assert board.rectangles_to_draw() == copy.rectangles_to_draw()
+
+
+def test_persistent_block():
+    """Test that moves on a PersistentBlock give the same board as on a Block,
+    leave the old board as it was, and share the untouched blocks.
+    """
+    board, flatten_expected = construct_board()
+    persistent = persistent_from_block(board)
+    assert persistent.flatten() == flatten_expected
+
+    moved = persistent.rotate(1, (0,)).swap(1)
+    board.children[0].rotate(1)
+    board.swap(1)
+    assert persistent.flatten() == flatten_expected
+    assert moved.flatten() == board.flatten()
+    assert moved.board_hash() == board.board_hash()
+    assert moved.children[1] is persistent.children[2]
+    for goal in [BlobGoal(COLOUR_LIST[1]), PerimeterGoal(COLOUR_LIST[3])]:
+        assert goal.score(moved) == goal.score(board)
+
+
+def test_serialize_board(tmp_path):
+    """Test that a board saved as bytes, alone or in an archive, loads back
+    with the same unit cells.
+    """
+    board, flatten_expected = construct_board()
+    data = serialize_board(board)
+    assert deserialize_board(data).flatten() == flatten_expected
+
+    board.children[0].rotate(1)
+    path = str(tmp_path / 'boards.bin')
+    assert write_archive(path, [Block(0, COLOUR_LIST[3]), board]) == 2
+    with BoardArchive(path) as archive:
+        assert len(archive) == 2
+        assert archive[0].flatten() == [[COLOUR_LIST[3]]]
+        assert archive[1].flatten() == board.flatten()
+        assert archive.board_bytes(1) == serialize_board(board)
+
+
+def test_legal_moves():
+    """Test that legal_moves lists moves that each change the board
+    differently, and none on blocks whose children are all the same.
+    """
+    board, flatten_expected = construct_board()
+    moves = legal_moves(board)
+    assert len(moves) == len(set(moves))
+
+    flattened = []
+    for move in moves:
+        path, option = decode_move(move)
+        assert encode_move(path, option) == move
+        block = make_move(board, move)
+        flattened.append(board.flatten())
+        undo_move(block, option)
+    assert board.flatten() == flatten_expected
+    assert flatten_expected not in flattened
+    for i in range(len(flattened)):
+        assert flattened[i] not in flattened[i + 1:]
+
+    same = Block(0, children=[Block(1, COLOUR_LIST[0]) for _ in range(4)])
+    for block in [same] + same.children:
+        block.max_depth = 2
+    assert legal_moves(same) == []
+
+
+def test_vec_env():
+    """Test that moves made by VecBlockyEnv give the same boards as moves on
+    a Block, and that it scores every player of every game.
+    """
+    board, _ = construct_board()
+    env = VecBlockyEnv(2, board.max_depth, 2, 1)
+    env.reset(148)
+    env.grids = numpy.stack([board.flatten_array()] * 2)
+    moves = [encode_move([0], 2), encode_move([], 1)]
+
+    grids, scores, done = env.step(numpy.array(moves))
+    assert not done
+    for i in range(2):
+        copy = board.copy()
+        make_move(copy, moves[i])
+        assert grids[i].tolist() == copy.flatten_array().tolist()
+        for player in range(2):
+            colour = COLOUR_LIST[env.targets[i, player]]
+            if env.blob_goals[i, player]:
+                goal = BlobGoal(colour)
+            else:
+                goal = PerimeterGoal(colour)
+            assert scores[i, player] == goal.score(copy)
 
 
 def test_random_player_game():
@@ -280,6 +680,96 @@ def test_smart_player_game():
     game.run_game(3)
 
 
+def test_headless_game():
+    """
+    Put random and smart players against each other without a display, and
+    ensure the game ends
+    """
+    import random
+    random.seed(1001)
+    game = Game(4, 0, 2, [1, 5], headless=True)
+    game.run_game(3)
+
+
+def test_parallel_smart_player():
+    """
+    Ensure a SmartPlayer that scores its moves on worker processes plays the
+    same game as one that scores them itself
+    """
+    import random
+    scores = []
+    for processes in [0, 2]:
+        random.seed(1001)
+        game = Game(4, 0, 1, [5], headless=True, processes=processes)
+        scores.append(game.run_game(3, verbose=False))
+    assert scores[0] == scores[1]
+
+
+def test_time_budget_smart_player():
+    """
+    Ensure a SmartPlayer with a time budget tries at least one move each
+    turn, and stops once its budget is spent
+    """
+    import random
+    import time
+    random.seed(1001)
+    game = Game(5, 0, 0, [0], headless=True, time_budget=20)
+    player = game.players[0]
+    # a slow move, as after a pause for garbage collection, is forgotten.
+    player._score_time = 0.025
+    for _ in range(3):
+        num_candidates = len(legal_moves(game.board))
+        start = time.perf_counter()
+        player.make_move(game.board)
+        # the budget of 20 milliseconds, with plenty of room for a busy
+        # machine.
+        assert time.perf_counter() - start < 0.5
+        assert 1 <= player.evaluated <= num_candidates
+    assert player._score_time < 0.025
+
+
+def test_mcts_player():
+    """
+    Ensure an MCTSPlayer leaves the board as it was except for its own move,
+    and keeps its search tree when the board is as it expects
+    """
+    import random
+    random.seed(1001)
+    board = random_init(0, 3)
+    board.update_block_locations((0, 0), 750)
+    player = MCTSPlayer(NullRenderer(1), 0, BlobGoal(COLOUR_LIST[0]),
+                        iterations=50)
+    before = BlobGoal(COLOUR_LIST[0]).score(board)
+    player.make_move(board)
+    assert player.evaluated == 50
+    assert BlobGoal(COLOUR_LIST[0]).score(board) >= before
+    tree = player._tree
+    player.make_move(board)
+    assert tree.visits > 50 or len(tree.children) == 0
+
+
+def test_tournament_game():
+    """
+    Play one tournament game twice, and ensure its seed decides the result,
+    and that only the moves which change the board are counted
+    """
+    from tournament import tournament_configs, play_game
+    config = tournament_configs([3], [[2]], [1], ['blob'], [7], 2)[0]
+    first = play_game(config)
+    second = play_game(config)
+    assert first['scores'] == second['scores']
+    assert first['winner'] == second['winner']
+    assert first['moves'] == second['moves'] <= 4
+
+    # no move can change a board of one colour, so none is counted.
+    game = Game(2, 0, 0, [1], headless=True)
+    game.board = Block(0, COLOUR_LIST[0])
+    game.board.max_depth = 2
+    game.board.update_block_locations((0, 0), 750)
+    game.run_game(2, verbose=False)
+    assert game.moves_made == 0
+
+
 ###############################################################################
 # Test helpers
 ###############################################################################
@@ -0,0 +1,133 @@
+"""Assignment 2 - Blocky
+
+=== CSC148 Fall 2017 ===
+Diane Horton and David Liu
+Department of Computer Science,
+University of Toronto
+
+
+=== Module Description ===
+
+This file contains functions to run tournaments of many games between
+computer players, in parallel and without drawing them, and to record the
+result of every game.
+
+At the bottom of the file, there is an example tournament comparing the
+difficulties of SmartPlayer.
+"""
+import csv
+import itertools
+import json
+import random
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional
+from game import Game, find_winner
+from goal import BlobGoal, PerimeterGoal
+
+# The columns of a tournament's CSV output, in order.
+RESULT_FIELDS = ['game', 'max_depth', 'smart_players', 'random_players',
+                 'goal', 'seed', 'num_turns', 'scores', 'winner', 'moves',
+                 'wall_time']
+
+# The goal types a tournament can assign to every player.  'random' keeps
+# the goal that the Game picked at random for each player.
+GOAL_TYPES = {'blob': BlobGoal, 'perimeter': PerimeterGoal, 'random': None}
+
+
+def tournament_configs(max_depths: List[int],
+                       smart_players: List[List[int]],
+                       random_players: List[int],
+                       goals: List[str],
+                       seeds: List[int],
+                       num_turns: int) -> List[Dict[str, Any]]:
+    """Return the configuration of one game for every combination of
+    the given <max_depths>, lists of SmartPlayer difficulties in
+    <smart_players>, numbers of RandomPlayers in <random_players>, goal
+    types in <goals> and <seeds>.  Every game lasts <num_turns> turns.
+
+    Games are numbered in order, starting from 0.
+
+    Precondition:
+        every goal type in <goals> is a key of GOAL_TYPES
+        each combination has at least one player
+    """
+    configs = []
+    for max_depth, smart, num_random, goal, seed in itertools.product(
+            max_depths, smart_players, random_players, goals, seeds):
+        configs.append({'game': len(configs), 'max_depth': max_depth,
+                        'smart_players': list(smart),
+                        'random_players': num_random, 'goal': goal,
+                        'seed': seed, 'num_turns': num_turns})
+    return configs
+
+
+def play_game(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Play the headless game described by <config>, as returned by
+    tournament_configs, and return its result.
+
+    The result holds everything in <config>, the final score of each player,
+    the index of the winner, the number of turns in which a player changed
+    the board and the time the game took, in seconds.
+
+    The random module is seeded with the game's seed first, so the same
+    configuration always plays the same game, in any process.
+    """
+    start = time.perf_counter()
+    random.seed(config['seed'])
+    game = Game(config['max_depth'], 0, config['random_players'],
+                config['smart_players'], headless=True)
+    goal_class = GOAL_TYPES[config['goal']]
+    if goal_class is not None:
+        for player in game.players:
+            player.goal = goal_class(player.goal.colour)
+
+    scores = game.run_game(config['num_turns'], verbose=False)
+
+    result = dict(config)
+    result['scores'] = scores
+    result['winner'] = find_winner(scores)
+    result['moves'] = game.moves_made
+    result['wall_time'] = time.perf_counter() - start
+    return result
+
+
+def run_tournament(configs: List[Dict[str, Any]], output_path: str,
+                   processes: Optional[int] = None) -> None:
+    """Play every game in <configs> on a pool of <processes> worker
+    processes, or one per CPU if <processes> is None, and write their
+    results to the file at <output_path>.
+
+    Each result is written as soon as it is available, in the order of
+    <configs>.  If <output_path> ends in '.csv', write one row per game with
+    the columns in RESULT_FIELDS, and the scores separated by spaces.
+    Otherwise, write one JSON object per line.
+    """
+    with open(output_path, 'w', newline='') as output, \
+            Pool(processes) as pool:
+        writer = None
+        if output_path.endswith('.csv'):
+            writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+
+        for result in pool.imap(play_game, configs):
+            if writer is not None:
+                row = dict(result)
+                row['smart_players'] = ' '.join(
+                    str(difficulty) for difficulty in result['smart_players'])
+                row['scores'] = ' '.join(str(s) for s in result['scores'])
+                writer.writerow(row)
+            else:
+                output.write(json.dumps(result) + '\n')
+            output.flush()
+
+
+if __name__ == '__main__':
+    # Each difficulty of SmartPlayer against a RandomPlayer, on 20 boards
+    # of each depth.
+    run_tournament(tournament_configs([3, 4, 5],
+                                      [[difficulty] for difficulty in
+                                       range(6)],
+                                      [1], ['blob', 'perimeter'],
+                                      list(range(20)), 5),
+                   'tournament.jsonl')